@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 """Check for recently processed images and show detailed records."""
 
-from database.supabase_client import SupabaseClient
-from datetime import datetime, timedelta
+from database.supabase_client import (
+    MEDIA_FILES_TABLE,
+    PIPELINE_TABLE,
+    PROCESS_TYPE_ENHANCEMENT,
+    STATUS_COMPLETED,
+    get_client,
+)
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import json
 
@@ -14,21 +20,27 @@ def check_recent_processing():
     print("=" * 60)
     
     try:
-        db_client = SupabaseClient()
+        db_client = get_client()
         
         # Check for recently completed pipeline records
-        recent_cutoff = datetime.utcnow() - timedelta(minutes=5)
+        # Timezone-aware cutoff so PostgREST compares against updated_at as timestamptz
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(minutes=5)
         
         print(f"\n📋 RECENT PIPELINE COMPLETIONS (last 5 minutes):")
-        recent_pipelines = db_client.client.table("media_processing_pipeline").select(
+        # Embed source and output media rows via their foreign keys (one round-trip)
+        recent_pipelines = db_client.client.table(PIPELINE_TABLE).select(
             "pipeline_id", "source_media_id", "process_status", "output_media_id", 
-            "process_results", "processing_time_ms", "updated_at", "created_at"
-        ).eq("process_type", "enhancement").eq(
-            "process_status", "completed"
-        ).gte("updated_at", recent_cutoff.isoformat()).order("updated_at", desc=True).execute()
+            "process_results", "processing_time_ms", "updated_at", "created_at",
+            "source:media_files!media_processing_pipeline_source_media_id_fkey"
+            "(media_id,file_path,status,approval_status,created_at,metadata)",
+            "output:media_files!media_processing_pipeline_output_media_id_fkey"
+            "(media_id,file_path,status,metadata)"
+        ).eq("process_type", PROCESS_TYPE_ENHANCEMENT).eq(
+            "process_status", STATUS_COMPLETED
+        ).gte("updated_at", recent_cutoff.isoformat()).order("updated_at", desc=True).limit(1).execute()
         
         if recent_pipelines.data:
-            print(f"✅ Found {len(recent_pipelines.data)} recently completed processing jobs:")
+            print(f"✅ Found a recently completed processing job:")
             
             for pipeline in recent_pipelines.data:
                 print(f"\n🎯 PIPELINE RECORD:")
@@ -38,13 +50,9 @@ def check_recent_processing():
                 print(f"   Processing Time: {pipeline['processing_time_ms']}ms")
                 print(f"   Completed At: {pipeline['updated_at']}")
                 
-                # Get the source media details
-                source_media = db_client.client.table("media_files").select(
-                    "media_id", "file_path", "status", "approval_status", "created_at", "metadata"
-                ).eq("media_id", pipeline['source_media_id']).execute()
-                
-                if source_media.data:
-                    source = source_media.data[0]
+                # Source media details
+                source = pipeline.get('source')
+                if source:
                     print(f"\n📸 SOURCE IMAGE:")
                     print(f"   Media ID: {source['media_id']}")
                     print(f"   File Path: {source['file_path']}")
@@ -52,18 +60,13 @@ def check_recent_processing():
                     print(f"   Approval: {source['approval_status']}")
                     print(f"   Uploaded: {source['created_at']}")
                 
-                # Get the processed image details
-                if pipeline['output_media_id']:
-                    processed_media = db_client.client.table("media_files").select(
-                        "media_id", "file_path", "status", "metadata"
-                    ).eq("media_id", pipeline['output_media_id']).execute()
-                    
-                    if processed_media.data:
-                        processed = processed_media.data[0]
-                        print(f"\n✅ PROCESSED IMAGE:")
-                        print(f"   Media ID: {processed['media_id']}")
-                        print(f"   File Path: {processed['file_path']}")
-                        print(f"   Status: {processed['status']}")
+                # Processed image details
+                processed = pipeline.get('output')
+                if processed:
+                    print(f"\n✅ PROCESSED IMAGE:")
+                    print(f"   Media ID: {processed['media_id']}")
+                    print(f"   File Path: {processed['file_path']}")
+                    print(f"   Status: {processed['status']}")
                 
                 # Show processing results
                 if pipeline['process_results']:
@@ -95,9 +98,9 @@ def check_recent_processing():
             
             # Check for any recent pipeline activity (any status)
             print(f"\n🔍 ANY RECENT PIPELINE ACTIVITY:")
-            any_recent = db_client.client.table("media_processing_pipeline").select(
+            any_recent = db_client.client.table(PIPELINE_TABLE).select(
                 "pipeline_id", "source_media_id", "process_status", "updated_at"
-            ).eq("process_type", "enhancement").gte(
+            ).eq("process_type", PROCESS_TYPE_ENHANCEMENT).gte(
                 "updated_at", recent_cutoff.isoformat()
             ).order("updated_at", desc=True).limit(3).execute()
             
@@ -119,10 +122,12 @@ def get_specific_image_status(media_id: str):
     print("=" * 50)
     
     try:
-        db_client = SupabaseClient()
+        db_client = get_client()
         
         # Get media file record
-        media_record = db_client.client.table("media_files").select("*").eq("media_id", media_id).execute()
+        media_record = db_client.client.table(MEDIA_FILES_TABLE).select(
+            "media_id", "file_path", "status", "approval_status", "created_at", "metadata"
+        ).eq("media_id", media_id).execute()
         
         if media_record.data:
             print(f"📸 MEDIA FILE RECORD:")
@@ -134,9 +139,10 @@ def get_specific_image_status(media_id: str):
                     print(f"   {key}: {value}")
         
         # Get pipeline record
-        pipeline_record = db_client.client.table("media_processing_pipeline").select("*").eq(
-            "source_media_id", media_id
-        ).eq("process_type", "enhancement").execute()
+        pipeline_record = db_client.client.table(PIPELINE_TABLE).select(
+            "pipeline_id", "source_media_id", "output_media_id", "process_status",
+            "process_results", "processing_time_ms", "updated_at", "error_details"
+        ).eq("source_media_id", media_id).eq("process_type", PROCESS_TYPE_ENHANCEMENT).execute()
         
         if pipeline_record.data:
             print(f"\n⚙️  PIPELINE RECORD:")
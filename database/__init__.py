@@ -1,5 +1,6 @@
 """Database operations for OnShelf service."""
 
-from .supabase_client import SupabaseClient
+from .supabase_client import SupabaseClient, get_client
+from .query_cache import QueryCache
 
-__all__ = ["SupabaseClient"] 
\ No newline at end of file
+__all__ = ["SupabaseClient", "get_client", "QueryCache"] 
\ No newline at end of file
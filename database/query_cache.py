@@ -0,0 +1,37 @@
+"""Run-scoped memoization of read queries for the diagnostic scripts."""
+
+from typing import Any, Dict, Hashable
+
+
+class QueryCache:
+    """
+    Memoize query results for the lifetime of one diagnostic run.
+    
+    Results are keyed by a caller-supplied tuple describing the query
+    (table, filter values, columns), so looking up the same rows twice in
+    a run returns the first response instead of issuing another request.
+    Only use it for reads whose results are not expected to change mid-run.
+    """
+    
+    def __init__(self):
+        """Create an empty cache."""
+        self._results: Dict[Hashable, Any] = {}
+    
+    def execute(self, key: Hashable, query) -> Any:
+        """
+        Return the cached response for key, executing query on first use.
+        
+        Args:
+            key: Hashable description of the query
+            query: Built PostgREST query (anything with .execute())
+            
+        Returns:
+            Query response
+        """
+        if key not in self._results:
+            self._results[key] = query.execute()
+        return self._results[key]
+    
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._results.clear()
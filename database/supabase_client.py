@@ -1,31 +1,171 @@
 """Supabase database client for managing image processing workflow."""
 
+from __future__ import annotations
+
 import os
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import asyncio
+import functools
+import struct
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
 import time
 from supabase import create_client, Client
 import httpx
-import numpy as np
-import cv2
 from utils.logging import setup_logging, log_database_operation
 
+# numpy, OpenCV and TurboJPEG are imported on first image transfer so scripts
+# that only query the database don't pay their import cost
+if TYPE_CHECKING:
+    import numpy as np
+
+# Table, process type and status values used in pipeline queries
+MEDIA_FILES_TABLE = "media_files"
+PIPELINE_TABLE = "media_processing_pipeline"
+PROCESS_TYPE_ENHANCEMENT = "enhancement"
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+PROCESSOR_VERSION = "1.0.0"
+
+# Default upload quality (override with JPEG_QUALITY). Q88 is visually
+# indistinguishable from Q95 on shelf photos at well under half the bytes
+JPEG_QUALITY = 88
+
+# How long a health_check result is reused before querying the database again
+HEALTH_CHECK_TTL_SECONDS = 5.0
+
+# How long a get_pending_images result is reused, so pollers asking for the
+# same batch within one tick share a query (any status change clears it)
+PENDING_IMAGES_TTL_SECONDS = 2.0
+
+
+@functools.lru_cache(maxsize=1)
+def _env_config() -> Tuple[Optional[str], Optional[str], str]:
+    """Read Supabase credentials and log level from the environment once."""
+    return (
+        os.getenv("SUPABASE_URL"),
+        os.getenv("SUPABASE_SERVICE_KEY"),
+        os.getenv("LOG_LEVEL", "INFO")
+    )
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as an ISO-8601 string with millisecond precision."""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _exif_orientation(content: bytearray) -> int:
+    """
+    Read the EXIF Orientation tag from JPEG bytes.
+    
+    Only the APP segments before the first scan are examined, so this costs
+    a few header reads regardless of image size.
+    
+    Returns:
+        Orientation value 1-8, or 1 when the tag is absent or unreadable
+    """
+    view = memoryview(content)
+    offset = 2
+    try:
+        while view[offset] == 0xFF and view[offset + 1] != 0xDA:
+            (length,) = struct.unpack_from(">H", view, offset + 2)
+            if view[offset + 1] == 0xE1 and view[offset + 4:offset + 10] == b"Exif\x00\x00":
+                tiff = view[offset + 10:offset + 2 + length]
+                endian = "<" if tiff[:2] == b"II" else ">"
+                (ifd,) = struct.unpack_from(endian + "I", tiff, 4)
+                (count,) = struct.unpack_from(endian + "H", tiff, ifd)
+                for entry in range(ifd + 2, ifd + 2 + 12 * count, 12):
+                    tag, _, _, value = struct.unpack_from(endian + "HHIH", tiff, entry)
+                    if tag == 0x0112:
+                        return value if 1 <= value <= 8 else 1
+                return 1
+            offset += 2 + length
+    except (IndexError, struct.error):
+        pass
+    return 1
+
+
+def _apply_exif_orientation(image: np.ndarray, orientation: int) -> np.ndarray:
+    """Rotate/flip a decoded image upright the way cv2.imdecode does for EXIF orientation."""
+    import cv2
+    
+    if orientation == 2:
+        return cv2.flip(image, 1)
+    if orientation == 3:
+        return cv2.rotate(image, cv2.ROTATE_180)
+    if orientation == 4:
+        return cv2.flip(image, 0)
+    if orientation == 5:
+        return cv2.transpose(image)
+    if orientation == 6:
+        return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 7:
+        return cv2.flip(cv2.transpose(image), -1)
+    if orientation == 8:
+        return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return image
+
 
 class SupabaseClient:
-    """Handle all Supabase database and storage operations."""
+    """
+    Handle all Supabase database and storage operations.
+    
+    Queries rely on the functions in setup_pipeline_functions.sql and the
+    indexes in setup_performance_indexes.sql:
+    - idx_media_files_pending: media_files(approval_status, status, created_at)
+    - idx_pipeline_source_type: media_processing_pipeline(source_media_id, process_type)
+    """
+    
+    # Logger shared by every client instance, configured on first construction
+    _logger = None
     
     def __init__(self, supabase_url: str = None, service_key: str = None):
         """Initialize Supabase client with credentials."""
-        self.logger = setup_logging(os.getenv("LOG_LEVEL", "INFO"))
+        env_url, env_key, log_level = _env_config()
+        if SupabaseClient._logger is None:
+            SupabaseClient._logger = setup_logging(log_level)
+        self.logger = SupabaseClient._logger
         
-        self.supabase_url = supabase_url or os.getenv("SUPABASE_URL")
-        self.service_key = service_key or os.getenv("SUPABASE_SERVICE_KEY")
+        self.supabase_url = supabase_url or env_url
+        self.service_key = service_key or env_key
         
         if not self.supabase_url or not self.service_key:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be provided")
         
         self.client: Client = create_client(self.supabase_url, self.service_key)
         self.storage_bucket = "retail-captures"
+        self.jpeg_quality = int(os.getenv("JPEG_QUALITY", str(JPEG_QUALITY)))
+        
+        # Persistent HTTP clients so storage downloads and uploads reuse pooled
+        # (HTTP/2 multiplexed) connections
+        self._http = httpx.Client(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+        self._async_http: Optional[httpx.AsyncClient] = None
+        
+        # Table queries and RPCs go through postgrest's own httpx session;
+        # replace it with the same kind of HTTP/2 keep-alive pool
+        postgrest = self.client.postgrest
+        default_session = postgrest.session
+        postgrest.session = httpx.Client(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=default_session.timeout,
+            follow_redirects=default_session.follow_redirects,
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0)
+        )
+        default_session.close()
+        
+        # libjpeg-turbo codec, loaded on first use (see _turbojpeg)
+        self._tj = None
+        self._tj_loaded = False
+        
+        self._health_cache: Optional[Tuple[Dict[str, Any], float]] = None
+        self._pending_cache: Dict[int, Tuple[List[Dict[str, Any]], float]] = {}
         
         self.logger.info("supabase_client_initialized", url=self.supabase_url)
     
@@ -33,54 +173,29 @@ class SupabaseClient:
         """
         Get approved images that need processing.
         
+        Eligibility (no enhancement pipeline record, or one left 'pending'/'failed')
+        is evaluated server-side by the get_pending_enhancement function from
+        setup_pipeline_functions.sql, which returns exactly `limit` rows ordered
+        by created_at. Results are reused for PENDING_IMAGES_TTL_SECONDS per
+        limit, until a status change (see invalidate_pending_images).
+        
         Returns:
             List of image records ready for processing (mapped to expected format)
         """
+        cached = self._pending_cache.get(limit)
+        if cached is not None:
+            results, fetched_at = cached
+            if time.monotonic() - fetched_at < PENDING_IMAGES_TTL_SECONDS:
+                return list(results)
+        
         try:
-            # First get all approved, completed uploads
-            response = self.client.table("media_files").select(
-                "media_id", "file_path", "status", "approval_status", "metadata", "created_at"
-            ).eq(
-                "approval_status", "approved"
-            ).eq(
-                "status", "completed"  # Only process completed uploads
-            ).order(
-                "created_at"
-            ).limit(limit * 2).execute()  # Get more to account for filtering
-            
-            # Filter out images that already have completed pipeline records
-            # BUT INCLUDE images with pending/failed pipeline records that should be retried
-            unprocessed_images = []
-            for record in response.data:
-                # Check if this image already has an enhancement pipeline record
-                pipeline_check = self.client.table("media_processing_pipeline").select(
-                    "pipeline_id", "process_status"
-                ).eq("source_media_id", record["media_id"]).eq(
-                    "process_type", "enhancement"
-                ).execute()
-                
-                # Include if:
-                # 1. No pipeline record exists (new image)
-                # 2. Pipeline exists but status is 'pending' or 'failed' (retry needed)
-                should_process = False
-                if not pipeline_check.data:
-                    should_process = True  # New image, no pipeline record
-                else:
-                    pipeline_status = pipeline_check.data[0]["process_status"]
-                    if pipeline_status in ["pending", "failed"]:
-                        should_process = True  # Retry pending or failed
-                    # Skip if status is "completed" or "processing"
-                
-                if should_process:
-                    unprocessed_images.append(record)
-                    
-                    # Stop when we have enough
-                    if len(unprocessed_images) >= limit:
-                        break
+            response = self.client.rpc(
+                "get_pending_enhancement", {"p_limit": limit}
+            ).execute()
             
             # Map to expected format for the enhancement service
             mapped_results = []
-            for record in unprocessed_images:
+            for record in response.data:
                 mapped_record = {
                     "media_id": record["media_id"],
                     "storage_path": record["file_path"],  # Map file_path → storage_path
@@ -92,10 +207,11 @@ class SupabaseClient:
                 self.logger, 
                 "get_pending_images", 
                 True,
-                {"count": len(mapped_results), "limit": limit, "filtered_count": len(response.data)}
+                {"count": len(mapped_results), "limit": limit}
             )
             
-            return mapped_results
+            self._pending_cache[limit] = (mapped_results, time.monotonic())
+            return list(mapped_results)
             
         except Exception as e:
             log_database_operation(
@@ -106,6 +222,10 @@ class SupabaseClient:
             )
             raise
     
+    def invalidate_pending_images(self) -> None:
+        """Drop cached get_pending_images results after a status change."""
+        self._pending_cache.clear()
+    
     def mark_as_processing(self, media_id: str) -> bool:
         """
         Update image status to 'processing' before starting work.
@@ -116,33 +236,20 @@ class SupabaseClient:
         Returns:
             Success status
         """
+        self.invalidate_pending_images()
+        
         try:
-            # For now, we'll add a pipeline record to track processing
-            # First check if processing record already exists
-            existing = self.client.table("media_processing_pipeline").select("pipeline_id").eq(
-                "source_media_id", media_id
-            ).eq("process_type", "enhancement").execute()
-            
-            if not existing.data:
-                # Create new pipeline record
-                response = self.client.table("media_processing_pipeline").insert({
-                    "source_media_id": media_id,
-                    "process_type": "enhancement",
-                    "process_status": "processing",
-                    "process_config": {
-                        "processor_version": "1.0.0",
-                        "started_at": datetime.utcnow().isoformat()
-                    }
-                }).execute()
-            else:
-                # Update existing record
-                response = self.client.table("media_processing_pipeline").update({
-                    "process_status": "processing",
-                    "process_config": {
-                        "processor_version": "1.0.0", 
-                        "started_at": datetime.utcnow().isoformat()
-                    }
-                }).eq("source_media_id", media_id).eq("process_type", "enhancement").execute()
+            # Create or reset the pipeline record in one INSERT ... ON CONFLICT DO UPDATE
+            # (relies on the unique (source_media_id, process_type) index)
+            response = self.client.table(PIPELINE_TABLE).upsert({
+                "source_media_id": media_id,
+                "process_type": PROCESS_TYPE_ENHANCEMENT,
+                "process_status": STATUS_PROCESSING,
+                "process_config": {
+                    "processor_version": PROCESSOR_VERSION,
+                    "started_at": _utc_timestamp()
+                }
+            }, on_conflict="source_media_id,process_type").execute()
             
             log_database_operation(
                 self.logger,
@@ -171,6 +278,10 @@ class SupabaseClient:
         """
         Update image with successful processing results.
         
+        The finalize_pipeline function creates the processed media_files record
+        (inheriting upload_id and source metadata) and completes the pipeline
+        record in a single transaction.
+        
         Args:
             media_id: UUID of the media file
             processed_path: Path to processed image in storage
@@ -179,69 +290,16 @@ class SupabaseClient:
         Returns:
             Success status
         """
+        self.invalidate_pending_images()
+        
         try:
-            # Get the original image details to inherit upload_id and other metadata
-            original_image = self.client.table("media_files").select(
-                "metadata", "file_path", "file_type"  # ✅ These exist in actual schema
-            ).eq("media_id", media_id).execute()
-            
-            if not original_image.data:
-                raise ValueError(f"Source image {media_id} not found")
+            response = self.client.rpc("finalize_pipeline", {
+                "p_media_id": media_id,
+                "p_processed_path": processed_path,
+                "p_metadata": metadata
+            }).execute()
             
-            original_data = original_image.data[0]
-            original_metadata = original_data.get("metadata", {})
-            original_file_path = original_data.get("file_path", "")
-            
-            # Extract original filename from file_path
-            original_filename = original_file_path.split("/")[-1] if original_file_path else "unknown.jpg"
-            
-            # Create processed image metadata inheriting upload_id
-            processed_metadata = {
-                "processed_from": media_id,
-                "processing_metadata": metadata,
-                "processor_version": "1.0.0",
-                "original_filename": original_filename,
-                "original_file_path": original_file_path
-            }
-            
-            # Inherit upload_id if it exists for consistency
-            if "upload_id" in original_metadata:
-                processed_metadata["upload_id"] = original_metadata["upload_id"]
-            
-            # Inherit other important metadata
-            if "public_url" in original_metadata:
-                processed_metadata["source_public_url"] = original_metadata["public_url"]
-            
-            if "size" in original_metadata:
-                processed_metadata["original_size"] = original_metadata["size"]
-                
-            if "mime_type" in original_metadata:
-                processed_metadata["original_mime_type"] = original_metadata["mime_type"]
-            
-            # Create a new media_files record for the processed image
-            processed_media_data = {
-                "upload_id": f"processed-{media_id[:8]}",  # Always provide required upload_id
-                "file_path": processed_path,
-                "file_type": "image", 
-                "status": "completed",
-                "metadata": processed_metadata
-            }
-            
-            # Override with original upload_id if it exists (for consistency)
-            if "upload_id" in original_metadata:
-                processed_media_data["upload_id"] = original_metadata["upload_id"]
-            
-            processed_media_response = self.client.table("media_files").insert(processed_media_data).execute()
-            
-            processed_media_id = processed_media_response.data[0]["media_id"]
-            
-            # Update the pipeline record
-            response = self.client.table("media_processing_pipeline").update({
-                "process_status": "completed",
-                "output_media_id": processed_media_id,
-                "process_results": metadata,
-                "processing_time_ms": int(metadata.get("processing_time_seconds", 0) * 1000)
-            }).eq("source_media_id", media_id).eq("process_type", "enhancement").execute()
+            processed_media_id = response.data
             
             log_database_operation(
                 self.logger,
@@ -250,8 +308,7 @@ class SupabaseClient:
                 {
                     "media_id": media_id, 
                     "processed_path": processed_path,
-                    "processed_media_id": processed_media_id,
-                    "inherited_upload_id": processed_metadata.get("upload_id", "none")
+                    "processed_media_id": processed_media_id
                 }
             )
             
@@ -277,16 +334,18 @@ class SupabaseClient:
         Returns:
             Success status
         """
+        self.invalidate_pending_images()
+        
         try:
-            response = self.client.table("media_processing_pipeline").update({
-                "process_status": "failed",
+            response = self.client.table(PIPELINE_TABLE).update({
+                "process_status": STATUS_FAILED,
                 "error_details": error_message,
                 "process_results": {
-                    "failed_at": datetime.utcnow().isoformat(),
+                    "failed_at": _utc_timestamp(),
                     "error": error_message,
-                    "processor_version": "1.0.0"
+                    "processor_version": PROCESSOR_VERSION
                 }
-            }).eq("source_media_id", media_id).eq("process_type", "enhancement").execute()
+            }).eq("source_media_id", media_id).eq("process_type", PROCESS_TYPE_ENHANCEMENT).execute()
             
             log_database_operation(
                 self.logger,
@@ -306,32 +365,129 @@ class SupabaseClient:
             )
             raise
     
-    def download_image(self, storage_path: str, max_retries: int = 3) -> np.ndarray:
+    def _get_async_http(self) -> httpx.AsyncClient:
+        """Return the pooled async HTTP client, creating it on first use."""
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        return self._async_http
+    
+    def _upload_request(self, file_path: str) -> Tuple[str, Dict[str, str]]:
+        """Return the storage upload URL and headers for a processed image."""
+        upload_url = f"{self.supabase_url}/storage/v1/object/{self.storage_bucket}/{file_path}"
+        headers = {
+            "Authorization": f"Bearer {self.service_key}",
+            "apikey": self.service_key,
+            "content-type": "image/jpeg",
+            "cache-control": "max-age=3600",
+            "x-upsert": "true"
+        }
+        return upload_url, headers
+    
+    def _public_url(self, storage_path: str) -> str:
+        """Construct the public storage URL for a file path."""
+        return f"{self.supabase_url}/storage/v1/object/public/{self.storage_bucket}/{storage_path}"
+    
+    @staticmethod
+    def _allocate_body_buffer(response: httpx.Response) -> bytearray:
+        """Preallocate a body buffer sized from Content-Length when it is reliable."""
+        content_length = response.headers.get("content-length")
+        if content_length is None or "content-encoding" in response.headers:
+            return bytearray()
+        return bytearray(int(content_length))
+    
+    def _turbojpeg(self):
+        """Return the libjpeg-turbo codec, or None to fall back to OpenCV."""
+        if not self._tj_loaded:
+            self._tj_loaded = True
+            try:
+                from turbojpeg import TurboJPEG
+            except ImportError:
+                return None
+            
+            try:
+                self._tj = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                self.logger.warning("turbojpeg_unavailable", error=str(e))
+        
+        return self._tj
+    
+    @staticmethod
+    def _check_reduction(reduction: int) -> None:
+        """Validate a decode reduction factor before any download is attempted."""
+        if reduction not in (1, 2, 4, 8):
+            raise ValueError(f"Unsupported reduction {reduction}; expected 1, 2, 4 or 8")
+    
+    def _decode_image(self, content: bytearray, reduction: int = 1) -> np.ndarray:
+        """Decode downloaded bytes into an OpenCV image, optionally downscaled."""
+        import numpy as np
+        import cv2
+        
+        read_flags = {
+            1: cv2.IMREAD_COLOR,
+            2: cv2.IMREAD_REDUCED_COLOR_2,
+            4: cv2.IMREAD_REDUCED_COLOR_4,
+            8: cv2.IMREAD_REDUCED_COLOR_8
+        }
+        tj = self._turbojpeg()
+        if tj is not None:
+            from turbojpeg import TJPF_BGR
+            try:
+                image = tj.decode(
+                    content,
+                    pixel_format=TJPF_BGR,
+                    scaling_factor=None if reduction == 1 else (1, reduction)
+                )
+            except OSError as e:
+                # Not a JPEG (or corrupt) - let OpenCV handle it
+                self.logger.debug("turbojpeg_decode_failed", error=str(e))
+            else:
+                # libjpeg-turbo ignores EXIF, so apply the orientation cv2.imdecode would
+                return _apply_exif_orientation(image, _exif_orientation(content))
+        
+        image_array = np.frombuffer(content, np.uint8)
+        image = cv2.imdecode(image_array, read_flags[reduction])
+        
+        if image is None:
+            raise ValueError("Failed to decode image")
+        
+        return image
+    
+    def download_image(self, storage_path: str, max_retries: int = 3, reduction: int = 1) -> np.ndarray:
         """
         Download image from Supabase storage and convert to OpenCV format.
         
         Args:
             storage_path: Path to image in storage bucket (from file_path field)
             max_retries: Maximum number of download attempts
+            reduction: Decode at 1/reduction resolution (1, 2, 4 or 8); JPEG
+                decoding skips DCT work for reduced sizes, so use it when only
+                a preview or quality metrics are needed
             
         Returns:
             OpenCV image array
         """
-        # Construct the public URL
-        image_url = f"{self.supabase_url}/storage/v1/object/public/{self.storage_bucket}/{storage_path}"
+        self._check_reduction(reduction)
+        image_url = self._public_url(storage_path)
         
         for attempt in range(max_retries):
             try:
-                # Download image data
-                response = httpx.get(image_url, timeout=30.0)
-                response.raise_for_status()
+                # Stream image data over the pooled connection straight into one buffer
+                with self._http.stream("GET", image_url) as response:
+                    response.raise_for_status()
+                    
+                    buffer = self._allocate_body_buffer(response)
+                    offset = 0
+                    for chunk in response.iter_bytes(65536):
+                        buffer[offset:offset + len(chunk)] = chunk
+                        offset += len(chunk)
+                    del buffer[offset:]
                 
                 # Convert to OpenCV format
-                image_array = np.frombuffer(response.content, np.uint8)
-                image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-                
-                if image is None:
-                    raise ValueError("Failed to decode image")
+                image = self._decode_image(buffer, reduction)
                 
                 self.logger.info(
                     "image_downloaded",
@@ -355,6 +511,102 @@ class SupabaseClient:
                 # Exponential backoff
                 time.sleep(2 ** attempt)
     
+    async def async_download_image(self, storage_path: str, max_retries: int = 3, reduction: int = 1) -> np.ndarray:
+        """
+        Download image without blocking the event loop.
+        
+        Lets a worker prefetch the next image while the current one is being
+        processed; several downloads can be awaited together with asyncio.gather.
+        
+        Args:
+            storage_path: Path to image in storage bucket (from file_path field)
+            max_retries: Maximum number of download attempts
+            reduction: Decode at 1/reduction resolution (1, 2, 4 or 8); JPEG
+                decoding skips DCT work for reduced sizes, so use it when only
+                a preview or quality metrics are needed
+            
+        Returns:
+            OpenCV image array
+        """
+        http = self._get_async_http()
+        self._check_reduction(reduction)
+        image_url = self._public_url(storage_path)
+        
+        for attempt in range(max_retries):
+            try:
+                async with http.stream("GET", image_url) as response:
+                    response.raise_for_status()
+                    
+                    buffer = self._allocate_body_buffer(response)
+                    offset = 0
+                    async for chunk in response.aiter_bytes(65536):
+                        buffer[offset:offset + len(chunk)] = chunk
+                        offset += len(chunk)
+                    del buffer[offset:]
+                
+                image = self._decode_image(buffer, reduction)
+                
+                self.logger.info(
+                    "image_downloaded",
+                    storage_path=storage_path,
+                    size=f"{image.shape[1]}x{image.shape[0]}",
+                    attempt=attempt + 1
+                )
+                
+                return image
+                
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    self.logger.error(
+                        "image_download_failed",
+                        storage_path=storage_path,
+                        error=str(e),
+                        attempts=max_retries
+                    )
+                    raise
+                
+                # Exponential backoff
+                await asyncio.sleep(2 ** attempt)
+    
+    def encode_image(self, image: np.ndarray) -> bytes:
+        """
+        Encode an image as JPEG for upload.
+        
+        Args:
+            image: OpenCV image array
+            
+        Returns:
+            JPEG bytes
+        """
+        # Baseline 4:2:0 JPEG. Uploads are bandwidth-bound, so the OpenCV path
+        # pays for optimized Huffman tables (a few % fewer bytes); progressive
+        # encoding costs CPU for no gain here
+        tj = self._turbojpeg()
+        if tj is not None:
+            from turbojpeg import TJPF_BGR, TJSAMP_420, TJFLAG_FASTDCT
+            image_bytes = tj.encode(
+                image,
+                quality=self.jpeg_quality,
+                pixel_format=TJPF_BGR,
+                jpeg_subsample=TJSAMP_420,
+                flags=TJFLAG_FASTDCT
+            )
+        else:
+            import cv2
+            success, buffer = cv2.imencode('.jpg', image, [
+                cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality,
+                cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+                cv2.IMWRITE_JPEG_PROGRESSIVE, 0
+            ])
+            
+            if not success:
+                raise ValueError("Failed to encode image as JPEG")
+            
+            # Convert to bytes
+            image_bytes = buffer.tobytes()
+        
+        return image_bytes
+    
     def upload_processed_image(
         self, 
         image: np.ndarray, 
@@ -372,30 +624,75 @@ class SupabaseClient:
         Returns:
             Storage path of the uploaded file
         """
-        # Encode image as JPEG with high quality
-        success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        image_bytes = self.encode_image(image)
+        
+        # Generate filename
+        file_path = f"processed/processed_{media_id}.jpg"
+        upload_url, headers = self._upload_request(file_path)
+        
+        for attempt in range(max_retries):
+            try:
+                # Upload to storage over the pooled client shared with downloads
+                response = self._http.post(upload_url, content=image_bytes, headers=headers)
+                response.raise_for_status()
+                
+                self.logger.info(
+                    "image_uploaded",
+                    media_id=media_id,
+                    file_path=file_path,
+                    size_kb=len(image_bytes) / 1024,
+                    attempt=attempt + 1
+                )
+                
+                return file_path
+                
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    self.logger.error(
+                        "image_upload_failed",
+                        media_id=media_id,
+                        error=str(e),
+                        attempts=max_retries
+                    )
+                    raise
+                
+                # Exponential backoff
+                time.sleep(2 ** attempt)
+    
+    async def async_upload_processed_image(
+        self, 
+        image: np.ndarray, 
+        media_id: str,
+        max_retries: int = 3
+    ) -> str:
+        """
+        Upload processed image without blocking the event loop.
         
-        if not success:
-            raise ValueError("Failed to encode image as JPEG")
+        JPEG encoding runs on the default thread pool and the upload goes through
+        the pooled async HTTP client, so the next image can be encoded while this
+        one is still in flight.
         
-        # Convert to bytes
-        image_bytes = buffer.tobytes()
+        Args:
+            image: OpenCV image array
+            media_id: UUID for naming the processed file
+            max_retries: Maximum number of upload attempts
+            
+        Returns:
+            Storage path of the uploaded file
+        """
+        loop = asyncio.get_running_loop()
+        image_bytes = await loop.run_in_executor(None, self.encode_image, image)
         
         # Generate filename
         file_path = f"processed/processed_{media_id}.jpg"
+        upload_url, headers = self._upload_request(file_path)
+        
+        http = self._get_async_http()
         
         for attempt in range(max_retries):
             try:
-                # Upload to storage
-                response = self.client.storage.from_(self.storage_bucket).upload(
-                    file_path,
-                    image_bytes,
-                    {
-                        "content-type": "image/jpeg",
-                        "cache-control": "3600",
-                        "upsert": "true"
-                    }
-                )
+                response = await http.post(upload_url, content=image_bytes, headers=headers)
+                response.raise_for_status()
                 
                 self.logger.info(
                     "image_uploaded",
@@ -418,29 +715,72 @@ class SupabaseClient:
                     raise
                 
                 # Exponential backoff
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(2 ** attempt)
     
     def health_check(self) -> Dict[str, Any]:
         """
         Check database connectivity and return health status.
         
+        Results are reused for HEALTH_CHECK_TTL_SECONDS so frequent liveness
+        probes don't each issue a query.
+        
         Returns:
             Health check results
         """
+        if self._health_cache is not None:
+            result, checked_at = self._health_cache
+            if time.monotonic() - checked_at < HEALTH_CHECK_TTL_SECONDS:
+                return result
+        
         try:
             # Try a simple query on the actual table
-            response = self.client.table("media_files").select("media_id").limit(1).execute()
+            response = self.client.table(MEDIA_FILES_TABLE).select("media_id").limit(1).execute()
             
-            return {
+            result = {
                 "database": "healthy",
                 "storage": "healthy",
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": _utc_timestamp()
             }
             
         except Exception as e:
-            return {
+            result = {
                 "database": "unhealthy",
                 "storage": "unknown",
                 "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            } 
\ No newline at end of file
+                "timestamp": _utc_timestamp()
+            }
+        
+        self._health_cache = (result, time.monotonic())
+        return result
+    
+    def get_status_counts(self) -> Dict[str, int]:
+        """
+        Count enhancement pipeline records by status.
+        
+        Uses PostgREST exact counts with limit(0), so no rows are transferred.
+        
+        Returns:
+            Mapping of process_status to record count
+        """
+        counts = {}
+        for status in (STATUS_PENDING, STATUS_PROCESSING, STATUS_COMPLETED, STATUS_FAILED):
+            response = self.client.table(PIPELINE_TABLE).select(
+                "pipeline_id", count="exact"
+            ).eq("process_type", PROCESS_TYPE_ENHANCEMENT).eq("process_status", status).limit(0).execute()
+            counts[status] = response.count or 0
+        
+        return counts
+    
+    async def aclose(self) -> None:
+        """Close pooled HTTP connections."""
+        self._http.close()
+        self.client.postgrest.session.close()
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> SupabaseClient:
+    """Return the process-wide SupabaseClient, creating it on first use."""
+    return SupabaseClient()
@@ -2,79 +2,95 @@
 """Diagnostic script to check pending image processing status."""
 
 import os
-from datetime import datetime, timedelta
+import sys
+import atexit
+import asyncio
+import httpx
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from database.supabase_client import SupabaseClient
+from database.supabase_client import (
+    MEDIA_FILES_TABLE,
+    PIPELINE_TABLE,
+    PROCESS_TYPE_ENHANCEMENT,
+    get_client,
+)
 
 # Load environment variables
 load_dotenv()
 
-def diagnose_pending_images():
+# Reused for every force-process request so repeated triggers skip the connection setup
+_api_client = httpx.Client(http2=True, timeout=30)
+atexit.register(_api_client.close)
+
+def _ts(row) -> str:
+    """Return a row's created_at trimmed to seconds, or 'unknown'."""
+    created = row.get('created_at')
+    return created[:19] if created else 'unknown'
+
+async def diagnose_pending_images():
     """Diagnose why images might not be getting processed."""
     try:
-        db_client = SupabaseClient()
+        db_client = get_client()
         
         print("🔍 DIAGNOSTIC: Checking Image Processing Pipeline")
         print("=" * 60)
         
+        # The reads below are independent, so run them concurrently and pay one
+        # round trip instead of three. Sections 1 and 2 come from one
+        # diagnose_pipeline call that joins media_files with each image's
+        # enhancement pipeline status.
+        recent_cutoff = datetime.now(timezone.utc) - timedelta(hours=2)
+        snapshot, pipeline_status, truly_pending = await asyncio.gather(
+            asyncio.to_thread(db_client.client.rpc(
+                "diagnose_pipeline", {"cutoff": recent_cutoff.isoformat(), "p_ready_limit": 10}
+            ).execute),
+            asyncio.to_thread(db_client.client.table(PIPELINE_TABLE).select(
+                "pipeline_id", "source_media_id", "process_type", "process_status", "created_at",
+                count="exact"
+            ).eq("process_type", PROCESS_TYPE_ENHANCEMENT).order("created_at", desc=True).limit(10).execute),
+            asyncio.to_thread(db_client.client.rpc("pending_enhancements", {"p_limit": 50}).execute),
+        )
+        
+        recent_media = [row for row in snapshot.data if row["is_recent"]]
+        approved_completed = [row for row in snapshot.data if row["is_ready"]]
+        pipeline_by_media = {
+            row["media_id"]: row for row in approved_completed if row["pipeline_id"] is not None
+        }
+        
         # 1. Check recent media uploads
         print("\n📁 RECENT MEDIA UPLOADS (last 2 hours):")
-        recent_cutoff = datetime.utcnow() - timedelta(hours=2)
-        
-        recent_media = db_client.client.table("media_files").select(
-            "media_id", "file_path", "status", "approval_status", "created_at"
-        ).gte("created_at", recent_cutoff.isoformat()).order("created_at", desc=True).execute()
-        
-        print(f"Found {len(recent_media.data)} recent uploads:")
-        for media in recent_media.data[:10]:  # Show latest 10
-            created = media.get('created_at', 'unknown')[:19] if media.get('created_at') else 'unknown'
+        print(f"Found {len(recent_media)} recent uploads:")
+        for media in recent_media[:10]:  # Show latest 10
+            created = _ts(media)
             print(f"  📸 {media['media_id'][:8]}... | {media['status']} | {media['approval_status']} | {created}")
         
         # 2. Check what's approved and completed but not processed
         print(f"\n✅ APPROVED & COMPLETED (ready for processing):")
-        approved_completed = db_client.client.table("media_files").select(
-            "media_id", "file_path", "status", "approval_status", "created_at"
-        ).eq("approval_status", "approved").eq("status", "completed").order("created_at", desc=True).limit(10).execute()
-        
-        print(f"Found {len(approved_completed.data)} approved & completed:")
-        for media in approved_completed.data:
-            # Check if has pipeline record
-            pipeline_check = db_client.client.table("media_processing_pipeline").select(
-                "pipeline_id", "process_status"
-            ).eq("source_media_id", media["media_id"]).eq("process_type", "enhancement").execute()
-            
-            pipeline_status = "NO PIPELINE" if not pipeline_check.data else pipeline_check.data[0]["process_status"]
-            created = media.get('created_at', 'unknown')[:19] if media.get('created_at') else 'unknown'
+        print(f"Found {len(approved_completed)} approved & completed:")
+        for media in approved_completed:
+            pipeline = pipeline_by_media.get(media["media_id"])
+            pipeline_status = "NO PIPELINE" if pipeline is None else pipeline["process_status"]
+            created = _ts(media)
             
             print(f"  🔄 {media['media_id'][:8]}... | {pipeline_status} | {created}")
         
         # 3. Check current pipeline processing status
         print(f"\n⚙️  CURRENT PIPELINE STATUS:")
-        pipeline_status = db_client.client.table("media_processing_pipeline").select(
-            "pipeline_id", "source_media_id", "process_type", "process_status", "created_at"
-        ).eq("process_type", "enhancement").order("created_at", desc=True).limit(10).execute()
-        
-        print(f"Found {len(pipeline_status.data)} enhancement pipelines:")
+        print(f"Found {pipeline_status.count} enhancement pipelines (latest {len(pipeline_status.data)}):")
         for pipe in pipeline_status.data:
-            created = pipe.get('created_at', 'unknown')[:19] if pipe.get('created_at') else 'unknown'
+            created = _ts(pipe)
             print(f"  ⚡ {pipe['source_media_id'][:8]}... | {pipe['process_status']} | {created}")
         
         # 4. Find truly pending work (approved+completed but no pipeline)
         print(f"\n🚨 TRULY PENDING (should be processed):")
-        pending_count = 0
-        for media in approved_completed.data:
-            pipeline_check = db_client.client.table("media_processing_pipeline").select(
-                "pipeline_id"
-            ).eq("source_media_id", media["media_id"]).eq("process_type", "enhancement").execute()
+        pending_count = len(truly_pending.data)
+        for index, media in enumerate(truly_pending.data):
+            created = _ts(media)
+            print(f"  🎯 {media['media_id']} | NEEDS PROCESSING | {created}")
             
-            if not pipeline_check.data:
-                pending_count += 1
-                created = media.get('created_at', 'unknown')[:19] if media.get('created_at') else 'unknown'
-                print(f"  🎯 {media['media_id']} | NEEDS PROCESSING | {created}")
-                
-                if pending_count == 1:  # Show details for first pending
-                    print(f"      📁 Path: {media['file_path']}")
-                    print(f"      📊 Status: {media['status']} | Approval: {media['approval_status']}")
+            if index == 0:  # Show details for first pending
+                print(f"      📁 Path: {media['file_path']}")
+                print(f"      📊 Status: {media['status']} | Approval: {media['approval_status']}")
         
         if pending_count == 0:
             print("  ✅ No truly pending images found")
@@ -100,8 +116,7 @@ def force_process_image(media_id: str):
         print(f"\n🚀 FORCE PROCESSING: {media_id}")
         
         # Make API call to the running service
-        import httpx
-        response = httpx.post(f"http://localhost:8001/process/{media_id}", timeout=30)
+        response = _api_client.post(f"http://localhost:8001/process/{media_id}")
         
         if response.status_code == 200:
             result = response.json()
@@ -113,7 +128,10 @@ def force_process_image(media_id: str):
         print(f"❌ Force processing failed: {e}")
 
 if __name__ == "__main__":
-    has_pending = diagnose_pending_images()
+    # Block-buffer the report; Python still flushes before input() prompts and at exit
+    sys.stdout.reconfigure(line_buffering=False)
+    
+    has_pending = asyncio.run(diagnose_pending_images())
     
     if has_pending:
         print(f"\n💡 RECOMMENDATION: Your service should pick these up within 30 seconds")
@@ -132,10 +150,12 @@ if __name__ == "__main__":
         check_specific = input(f"\n🔍 Enter specific media_id to check (or press Enter to skip): ").strip()
         if check_specific:
             try:
-                db_client = SupabaseClient()
+                db_client = get_client()
                 
                 # Check media_files
-                media_result = db_client.client.table("media_files").select("*").eq("media_id", check_specific).execute()
+                media_result = db_client.client.table(MEDIA_FILES_TABLE).select(
+                    "media_id", "upload_id", "file_path", "file_type", "status", "approval_status", "created_at"
+                ).eq("media_id", check_specific).execute()
                 
                 if media_result.data:
                     print(f"\n📋 MEDIA RECORD:")
@@ -144,7 +164,9 @@ if __name__ == "__main__":
                         print(f"  {key}: {value}")
                     
                     # Check pipeline
-                    pipeline_result = db_client.client.table("media_processing_pipeline").select("*").eq("source_media_id", check_specific).execute()
+                    pipeline_result = db_client.client.table(PIPELINE_TABLE).select(
+                        "pipeline_id", "source_media_id", "process_type", "process_status", "created_at", "error_details"
+                    ).eq("source_media_id", check_specific).execute()
                     
                     if pipeline_result.data:
                         print(f"\n⚙️  PIPELINE RECORD:")
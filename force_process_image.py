@@ -4,8 +4,7 @@
 import os
 import time
 from dotenv import load_dotenv
-from database.supabase_client import SupabaseClient
-from processors.enhanced_clahe import process_smart_enhancement
+from database.supabase_client import MEDIA_FILES_TABLE, get_client
 
 # Load environment variables
 load_dotenv()
@@ -16,12 +15,12 @@ def force_process_specific_image(media_id: str):
     print("=" * 60)
     
     try:
-        db_client = SupabaseClient()
+        db_client = get_client()
         start_time = time.time()
         
         # 1. Get image details
         print("📋 1. GETTING IMAGE DETAILS...")
-        media_response = db_client.client.table("media_files").select(
+        media_response = db_client.client.table(MEDIA_FILES_TABLE).select(
             "media_id", "file_path", "status", "approval_status"
         ).eq("media_id", media_id).execute()
         
@@ -30,10 +29,15 @@ def force_process_specific_image(media_id: str):
             return False
             
         image_data = media_response.data[0]
+        
+        # Loaded only once there is an image to process; pulls in OpenCV and numpy
+        from processors.enhanced_clahe import process_smart_enhancement
         print(f"   ✅ Found: {image_data['file_path']}")
         print(f"   📊 Status: {image_data['status']} | Approval: {image_data['approval_status']}")
         
         # 2. Update pipeline to processing
+        # Each status transition is a single round trip: an upsert here, one
+        # finalize_pipeline transaction on success, one UPDATE on failure
         print("\n⚙️  2. MARKING AS PROCESSING...")
         db_client.mark_as_processing(media_id)
         print("   ✅ Pipeline status updated to 'processing'")
@@ -2,29 +2,52 @@
 """Script to find the path of the last processed image."""
 
 import os
+import sys
+import time
+from typing import Any, Dict, Optional
 from dotenv import load_dotenv
-from database.supabase_client import SupabaseClient
 
 # Load environment variables
 load_dotenv()
 
-def get_last_processed_image():
+# The latest-image row is reused for this long (e.g. by the download step)
+LAST_PROCESSED_TTL_SECONDS = 5.0
+_last_processed_cache = None  # (row or None, monotonic timestamp)
+
+def _fetch_last_processed() -> Optional[Dict[str, Any]]:
+    """Query the most recently completed image, reusing a result younger than the TTL."""
+    global _last_processed_cache
+    if _last_processed_cache is not None:
+        row, fetched_at = _last_processed_cache
+        if time.monotonic() - fetched_at < LAST_PROCESSED_TTL_SECONDS:
+            return row
+    
+    # Imported on first query so --help and cached lookups skip the client stack
+    from database.supabase_client import MEDIA_FILES_TABLE, get_client
+    db_client = get_client()
+    
+    # Pull only the metadata fields shown below rather than the whole JSONB blob
+    response = db_client.client.table(MEDIA_FILES_TABLE).select(
+        "media_id", "storage_path", "processed_path", "created_at", "completed_at",
+        "enhancement_applied:processing_metadata->enhancement_applied",
+        "technique_used:processing_metadata->technique_used",
+        "processing_time_ms:processing_metadata->processing_time_ms"
+    ).eq("processing_status", "completed").order("completed_at", desc=True).limit(1).execute()
+    
+    row = response.data[0] if response.data else None
+    _last_processed_cache = (row, time.monotonic())
+    return row
+
+def get_last_processed_image() -> Optional[Dict[str, Any]]:
     """Get the path and metadata of the most recently processed image."""
     try:
-        # Initialize database client
-        db_client = SupabaseClient()
-        
         # Query for the most recent completed image
-        response = db_client.client.table("media_files").select(
-            "media_id", "storage_path", "processed_path", "processing_metadata", "created_at", "completed_at"
-        ).eq("processing_status", "completed").order("completed_at", desc=True).limit(1).execute()
+        latest_image = _fetch_last_processed()
         
-        if not response.data:
+        if latest_image is None:
             print("❌ No processed images found in database")
             return None
         
-        latest_image = response.data[0]
-        
         print("📸 Last Processed Image:")
         print("=" * 40)
         print(f"🆔 Media ID: {latest_image['media_id']}")
@@ -33,8 +56,12 @@ def get_last_processed_image():
         print(f"⏰ Completed At: {latest_image['completed_at']}")
         
         # Show processing metadata if available
-        if latest_image.get('processing_metadata'):
-            metadata = latest_image['processing_metadata']
+        metadata = {
+            key: latest_image[key]
+            for key in ("enhancement_applied", "technique_used", "processing_time_ms")
+            if latest_image.get(key) is not None
+        }
+        if metadata:
             print(f"\n📊 Processing Details:")
             if 'enhancement_applied' in metadata:
                 print(f"  Enhancement Applied: {metadata['enhancement_applied']}")
@@ -43,7 +70,7 @@ def get_last_processed_image():
             if 'processing_time_ms' in metadata:
                 print(f"  Processing Time: {metadata['processing_time_ms']:.1f}ms")
         
-        return latest_image['processed_path']
+        return latest_image
         
     except Exception as e:
         print(f"❌ Error querying database: {e}")
@@ -52,12 +79,14 @@ def get_last_processed_image():
 def download_last_processed_image(save_path: str = "last_processed_image.jpg"):
     """Download the last processed image to a local file."""
     try:
-        db_client = SupabaseClient()
+        from database.supabase_client import get_client
+        db_client = get_client()
         
-        # Get the last processed image path
-        processed_path = get_last_processed_image()
-        if not processed_path:
+        # Get the last processed image path (cached from the report lookup)
+        latest_image = _fetch_last_processed()
+        if not latest_image:
             return None
+        processed_path = latest_image['processed_path']
         
         print(f"\n📥 Downloading to: {save_path}")
         
@@ -76,13 +105,17 @@ def download_last_processed_image(save_path: str = "last_processed_image.jpg"):
         return None
 
 if __name__ == "__main__":
+    # Block-buffer the report; Python still flushes before input() prompts and at exit
+    sys.stdout.reconfigure(line_buffering=False)
+    
     print("🔍 Finding Last Processed Image")
     print("=" * 50)
     
     # Get the path
-    processed_path = get_last_processed_image()
+    latest_image = get_last_processed_image()
     
-    if processed_path:
+    if latest_image:
+        processed_path = latest_image['processed_path']
         print(f"\n🎯 Processed Image Path: {processed_path}")
         
         # Ask if user wants to download it locally
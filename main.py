@@ -4,18 +4,28 @@ import os
 import asyncio
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import signal
 import sys
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
 import uvicorn
+import numpy as np
+import structlog
 from dotenv import load_dotenv
 
-from database.supabase_client import SupabaseClient
+from database.supabase_client import (
+    MEDIA_FILES_TABLE,
+    PIPELINE_TABLE,
+    STATUS_PENDING,
+    SupabaseClient,
+)
 from processors.enhanced_clahe import process_smart_enhancement
+from processors.runtime import configure_opencv
 from utils.logging import setup_logging, log_processing_start, log_processing_complete, log_processing_failed
 
 # Load environment variables
@@ -26,62 +36,184 @@ logger = setup_logging(os.getenv("LOG_LEVEL", "INFO"))
 
 # Global variables
 db_client: Optional[SupabaseClient] = None
+process_pool: Optional[ProcessPoolExecutor] = None
 background_task_running = False
 shutdown_event = asyncio.Event()
+# Set to cut the poll wait short (e.g. on shutdown)
+wakeup_event = asyncio.Event()
+
+# Images that may wait between pipeline stages, and I/O workers per stage
+PIPELINE_QUEUE_DEPTH = 2
+
+# Each poll fetches this many batches' worth of images so the pipeline stays fed
+POLL_BATCH_MULTIPLIER = 4
 
 
-def process_image(media_id: str, storage_path: str) -> Dict[str, Any]:
+def process_job(image: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
     """
-    Complete image processing pipeline.
+    CPU stage of the pipeline: apply smart CLAHE enhancement.
+    
+    Pure function of the image - no database or storage access - so it can run
+    in a worker process.
+    
+    Args:
+        image: Downloaded OpenCV image array
+        
+    Returns:
+        Tuple of (enhanced_image, metadata)
+    """
+    # Initialize metadata
+    all_metadata = {
+        "processor_version": "2.0.0",
+        "original_size": f"{image.shape[1]}x{image.shape[0]}",
+        "processing_approach": "research_proven_clahe"
+    }
+    
+    # Apply smart CLAHE enhancement (replaces all 5 previous steps)
+    enhanced_image, enhancement_metadata = process_smart_enhancement(image)
+    all_metadata.update(enhancement_metadata)
+    
+    return enhanced_image, all_metadata
+
+
+def bind_job_logger(media_id: str) -> structlog.BoundLogger:
+    """
+    Bind media_id once for all of an image's log lines.
     
     Args:
         media_id: UUID of the media file
-        storage_path: Path to image in storage
         
     Returns:
-        Processing results dictionary
+        Logger whose events all carry media_id
     """
-    start_time = time.time()
-    current_stage = "initialization"
+    return logger.bind(media_id=media_id)
+
+
+def record_failure(
+    media_id: str,
+    job_logger: structlog.BoundLogger,
+    error: Exception,
+    current_stage: str
+) -> Dict[str, Any]:
+    """
+    Log a processing failure and mark the pipeline record as failed.
+    
+    Args:
+        media_id: UUID of the media file
+        job_logger: Logger bound to media_id (see bind_job_logger)
+        error: Exception raised by the failing stage
+        current_stage: Name of the stage that failed
+        
+    Returns:
+        Failed processing results dictionary
+    """
+    # Log failure
+    log_processing_failed(job_logger, error, current_stage)
     
+    # Mark as failed in database
     try:
-        # Log processing start
-        log_processing_start(logger, media_id, storage_path)
+        error_message = f"Failed at stage '{current_stage}': {str(error)}"
+        db_client.mark_as_failed(media_id, error_message)
+    except Exception as db_error:
+        job_logger.error(
+            "failed_to_mark_as_failed",
+            error=str(db_error)
+        )
+    
+    return {
+        "success": False,
+        "media_id": media_id,
+        "error": str(error),
+        "stage": current_stage
+    }
+
+
+async def download_job(media_id: str, job_logger: structlog.BoundLogger, storage_path: str) -> Optional[np.ndarray]:
+    """
+    I/O stage of the pipeline: mark the image as processing and download it.
+    
+    Args:
+        media_id: UUID of the media file
+        job_logger: Logger bound to media_id (see bind_job_logger)
+        storage_path: Path to image in storage
         
-        # Mark as processing
-        current_stage = "marking_as_processing"
-        db_client.mark_as_processing(media_id)
+    Returns:
+        Downloaded image, or None if the stage failed (already recorded)
+    """
+    current_stage = "marking_as_processing"
+    
+    try:
+        log_processing_start(job_logger, storage_path)
+        await asyncio.to_thread(db_client.mark_as_processing, media_id)
         
-        # Download image
         current_stage = "downloading"
-        image = db_client.download_image(storage_path)
+        return await db_client.async_download_image(storage_path)
         
-        # Initialize metadata
-        all_metadata = {
-            "processor_version": "2.0.0",
-            "original_size": f"{image.shape[1]}x{image.shape[0]}",
-            "processing_approach": "research_proven_clahe"
-        }
+    except Exception as e:
+        await asyncio.to_thread(record_failure, media_id, job_logger, e, current_stage)
+        return None
+
+
+async def enhance_job(
+    media_id: str,
+    job_logger: structlog.BoundLogger,
+    image: np.ndarray
+) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+    """
+    Run process_job off the event loop.
+    
+    Uses the worker process pool, or the default thread pool when no process
+    pool was started.
+    
+    Args:
+        media_id: UUID of the media file
+        job_logger: Logger bound to media_id (see bind_job_logger)
+        image: Output of download_job
         
-        # Apply smart CLAHE enhancement (replaces all 5 previous steps)
-        current_stage = "smart_enhancement"
-        enhanced_image, enhancement_metadata = process_smart_enhancement(image)
-        all_metadata.update(enhancement_metadata)
+    Returns:
+        Tuple of (enhanced_image, metadata), or None if the stage failed
+        (already recorded)
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(process_pool, process_job, image)
+    except Exception as e:
+        await asyncio.to_thread(record_failure, media_id, job_logger, e, "smart_enhancement")
+        return None
+
+
+async def upload_job(
+    media_id: str,
+    job_logger: structlog.BoundLogger,
+    enhanced_image: np.ndarray,
+    all_metadata: Dict[str, Any],
+    start_time: float
+) -> Dict[str, Any]:
+    """
+    I/O stage of the pipeline: upload the enhanced image and mark it completed.
+    
+    Args:
+        media_id: UUID of the media file
+        job_logger: Logger bound to media_id (see bind_job_logger)
+        enhanced_image: Output of process_job
+        all_metadata: Metadata from process_job
+        start_time: time.time() when the image's download started
         
-        # Upload processed image
-        current_stage = "uploading"
-        processed_path = db_client.upload_processed_image(enhanced_image, media_id)
+    Returns:
+        Processing results dictionary
+    """
+    current_stage = "uploading"
+    
+    try:
+        processed_path = await db_client.async_upload_processed_image(enhanced_image, media_id)
         
-        # Calculate processing time
         processing_time = time.time() - start_time
         all_metadata["processing_time_seconds"] = processing_time
         
-        # Mark as completed
         current_stage = "marking_as_completed"
-        db_client.mark_as_completed(media_id, processed_path, all_metadata)
+        await asyncio.to_thread(db_client.mark_as_completed, media_id, processed_path, all_metadata)
         
-        # Log completion
-        log_processing_complete(logger, media_id, processing_time, all_metadata)
+        log_processing_complete(job_logger, processing_time, all_metadata)
         
         return {
             "success": True,
@@ -92,39 +224,57 @@ def process_image(media_id: str, storage_path: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        # Log failure
-        log_processing_failed(logger, media_id, e, current_stage)
-        
-        # Mark as failed in database
-        try:
-            error_message = f"Failed at stage '{current_stage}': {str(e)}"
-            db_client.mark_as_failed(media_id, error_message)
-        except Exception as db_error:
-            logger.error(
-                "failed_to_mark_as_failed",
-                media_id=media_id,
-                error=str(db_error)
-            )
+        return await asyncio.to_thread(record_failure, media_id, job_logger, e, current_stage)
+
+
+async def process_image(media_id: str, storage_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Complete image processing pipeline for a single image.
+    
+    Args:
+        media_id: UUID of the media file
+        storage_path: Path to image in storage
         
-        return {
-            "success": False,
-            "media_id": media_id,
-            "error": str(e),
-            "stage": current_stage
-        }
+    Returns:
+        Processing results dictionary, or None if the image failed before
+        enhancement finished (the failure is recorded in the database)
+    """
+    start_time = time.time()
+    job_logger = bind_job_logger(media_id)
+    
+    image = await download_job(media_id, job_logger, storage_path)
+    if image is None:
+        return None
+    
+    enhanced = await enhance_job(media_id, job_logger, image)
+    if enhanced is None:
+        return None
+    
+    enhanced_image, all_metadata = enhanced
+    return await upload_job(media_id, job_logger, enhanced_image, all_metadata, start_time)
 
 
-async def process_pending_images():
-    """Process all pending images in the queue."""
+async def process_pending_images() -> int:
+    """
+    Process all pending images in the queue.
+    
+    Runs a three-stage pipeline - download, enhance, upload - connected by
+    bounded queues. Downloads and uploads overlap with enhancement, up to
+    MAX_CONCURRENT_PROCESSING enhancements run in parallel worker processes,
+    and the queue bounds cap how many decoded images are held in memory.
+    
+    Returns:
+        Number of images in this batch that were processed successfully
+    """
     try:
+        max_concurrent = int(os.getenv("MAX_CONCURRENT_PROCESSING", "5"))
+        
         # Get pending images
-        pending_images = db_client.get_pending_images(
-            limit=int(os.getenv("MAX_CONCURRENT_PROCESSING", "5"))
-        )
+        pending_images = db_client.get_pending_images(limit=max_concurrent * POLL_BATCH_MULTIPLIER)
         
         if not pending_images:
             logger.debug("no_pending_images", timestamp=datetime.utcnow().isoformat())
-            return
+            return 0
         
         logger.info(
             "processing_batch",
@@ -132,19 +282,51 @@ async def process_pending_images():
             timestamp=datetime.utcnow().isoformat()
         )
         
-        # Process each image
+        to_download = asyncio.Queue()
+        to_enhance = asyncio.Queue(maxsize=PIPELINE_QUEUE_DEPTH)
+        to_upload = asyncio.Queue(maxsize=PIPELINE_QUEUE_DEPTH)
         for image_data in pending_images:
-            if shutdown_event.is_set():
-                break
-                
-            media_id = image_data["media_id"]
-            storage_path = image_data["storage_path"]
-            
-            # Process image synchronously
-            result = process_image(media_id, storage_path)
-            
-            # Small delay between processing to avoid overload
-            await asyncio.sleep(1)
+            to_download.put_nowait(image_data)
+        
+        async def download_worker():
+            # Stop taking new images once shutdown starts; in-flight ones finish
+            while not shutdown_event.is_set() and not to_download.empty():
+                image_data = to_download.get_nowait()
+                start_time = time.time()
+                job_logger = bind_job_logger(image_data["media_id"])
+                image = await download_job(image_data["media_id"], job_logger, image_data["storage_path"])
+                if image is not None:
+                    await to_enhance.put((image_data["media_id"], job_logger, image, start_time))
+        
+        async def enhance_worker():
+            while (item := await to_enhance.get()) is not None:
+                media_id, job_logger, image, start_time = item
+                enhanced = await enhance_job(media_id, job_logger, image)
+                if enhanced is not None:
+                    await to_upload.put((media_id, job_logger, *enhanced, start_time))
+        
+        completed = 0
+        
+        async def upload_worker():
+            nonlocal completed
+            while (item := await to_upload.get()) is not None:
+                if (await upload_job(*item))["success"]:
+                    completed += 1
+        
+        downloaders = [asyncio.create_task(download_worker()) for _ in range(PIPELINE_QUEUE_DEPTH)]
+        enhancers = [asyncio.create_task(enhance_worker()) for _ in range(max_concurrent)]
+        uploaders = [asyncio.create_task(upload_worker()) for _ in range(PIPELINE_QUEUE_DEPTH)]
+        
+        # Drain stage by stage; None tells each downstream worker to exit
+        await asyncio.gather(*downloaders)
+        for _ in enhancers:
+            await to_enhance.put(None)
+        await asyncio.gather(*enhancers)
+        for _ in uploaders:
+            await to_upload.put(None)
+        await asyncio.gather(*uploaders)
+        
+        return completed
             
     except Exception as e:
         logger.error(
@@ -153,6 +335,57 @@ async def process_pending_images():
             error_type=type(e).__name__,
             exc_info=True
         )
+        return 0
+
+
+async def start_realtime_wakeup():
+    """
+    Subscribe to media_files and pipeline changes so new work wakes the worker immediately.
+    
+    Any insert or update of an approved image, or of an enhancement record
+    reset to pending (a retry or a manual reset), sets wakeup_event; the poll
+    interval remains as a fallback for missed events.
+    
+    Returns:
+        Connected realtime client to close on shutdown, or None when realtime is
+        unavailable (the worker then relies on polling alone)
+    """
+    try:
+        from realtime import AsyncRealtimeClient
+    except ImportError:
+        logger.info("realtime_wakeup_unavailable", reason="async realtime client not installed")
+        return None
+    
+    try:
+        realtime_client = AsyncRealtimeClient(
+            f"{db_client.supabase_url}/realtime/v1",
+            token=db_client.service_key
+        )
+        await asyncio.wait_for(realtime_client.connect(), timeout=10)
+        
+        channel = realtime_client.channel("image-processor-wakeup")
+        channel.on_postgres_changes(
+            "*",
+            schema="public",
+            table=MEDIA_FILES_TABLE,
+            filter="approval_status=eq.approved",
+            callback=lambda payload: wakeup_event.set()
+        )
+        channel.on_postgres_changes(
+            "*",
+            schema="public",
+            table=PIPELINE_TABLE,
+            filter=f"process_status=eq.{STATUS_PENDING}",
+            callback=lambda payload: wakeup_event.set()
+        )
+        await asyncio.wait_for(channel.subscribe(), timeout=10)
+        
+        logger.info("realtime_wakeup_subscribed")
+        return realtime_client
+        
+    except Exception as e:
+        logger.warning("realtime_wakeup_unavailable", error=str(e))
+        return None
 
 
 async def background_worker():
@@ -161,6 +394,7 @@ async def background_worker():
     background_task_running = True
     
     poll_interval = int(os.getenv("POLL_INTERVAL_SECONDS", "30"))
+    batch_size = int(os.getenv("MAX_CONCURRENT_PROCESSING", "5")) * POLL_BATCH_MULTIPLIER
     
     logger.info(
         "background_worker_started",
@@ -171,10 +405,24 @@ async def background_worker():
     while not shutdown_event.is_set():
         try:
             # Process pending images
-            await process_pending_images()
+            completed = await process_pending_images()
+            
+            # A full batch of successes means there is likely a backlog - poll
+            # again right away. Failed images are returned by the next poll,
+            # so only successes count; otherwise images that keep failing
+            # would be retried in a tight loop
+            if completed >= batch_size:
+                continue
             
-            # Wait for next poll interval
-            await asyncio.sleep(poll_interval)
+            # Wait for next poll interval, or until woken
+            try:
+                await asyncio.wait_for(wakeup_event.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            if wakeup_event.is_set():
+                # The pending set changed since the last poll
+                db_client.invalidate_pending_images()
+            wakeup_event.clear()
             
         except Exception as e:
             logger.error(
@@ -194,7 +442,7 @@ async def background_worker():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
-    global db_client
+    global db_client, process_pool
     
     # Startup
     logger.info("service_starting", timestamp=datetime.utcnow().isoformat())
@@ -207,6 +455,25 @@ async def lifespan(app: FastAPI):
         logger.error("database_client_initialization_failed", error=str(e))
         raise
     
+    # Enhancement is CPU-bound - give each concurrent image its own process.
+    # Spawned workers start clean instead of inheriting the event loop and
+    # HTTP client threads.
+    pool_size = min(int(os.getenv("MAX_CONCURRENT_PROCESSING", "5")), os.cpu_count() or 1)
+    worker_threads = max(1, (os.cpu_count() or 1) // pool_size)
+    process_pool = ProcessPoolExecutor(
+        max_workers=pool_size,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=configure_opencv,
+        initargs=(worker_threads,)
+    )
+    logger.info("process_pool_started", workers=pool_size)
+    
+    # Same limits for work done in this process (manual /process requests)
+    logger.info("opencv_configured", **configure_opencv(worker_threads))
+    
+    # Wake the worker on new uploads instead of waiting out the poll interval
+    realtime_client = await start_realtime_wakeup()
+    
     # Start background worker
     asyncio.create_task(background_worker())
     
@@ -215,6 +482,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("service_shutting_down", timestamp=datetime.utcnow().isoformat())
     shutdown_event.set()
+    wakeup_event.set()
     
     # Wait for background worker to finish
     max_wait = 30
@@ -223,6 +491,18 @@ async def lifespan(app: FastAPI):
         await asyncio.sleep(1)
         waited += 1
     
+    if realtime_client:
+        try:
+            await realtime_client.close()
+        except Exception as e:
+            logger.warning("realtime_close_failed", error=str(e))
+    
+    if process_pool:
+        process_pool.shutdown(wait=False, cancel_futures=True)
+    
+    if db_client:
+        await db_client.aclose()
+    
     logger.info("service_shutdown_complete", timestamp=datetime.utcnow().isoformat())
 
 
@@ -283,7 +563,7 @@ async def manual_process(media_id: str, background_tasks: BackgroundTasks):
     """
     try:
         # Verify image exists and needs processing
-        response = db_client.client.table("media_files").select(
+        response = db_client.client.table(MEDIA_FILES_TABLE).select(
             "media_id", "storage_path", "processing_status"
         ).eq("media_id", media_id).execute()
         
@@ -335,23 +615,12 @@ async def manual_process(media_id: str, background_tasks: BackgroundTasks):
 async def get_stats():
     """Get processing statistics."""
     try:
-        # Get counts by status
-        stats_response = db_client.client.table("media_files").select(
-            "processing_status", "count"
-        ).execute()
-        
-        # Count by status
-        status_counts = {
-            "pending": 0,
-            "processing": 0,
-            "completed": 0,
-            "failed": 0
-        }
+        # Get counts by status (server-side counts, no rows transferred)
+        status_counts = db_client.get_status_counts()
         
-        # This would need proper aggregation query
-        # For now, return basic info
         return {
             "timestamp": datetime.utcnow().isoformat(),
+            "status_counts": status_counts,
             "background_worker_active": background_task_running,
             "poll_interval_seconds": int(os.getenv("POLL_INTERVAL_SECONDS", "30")),
             "max_concurrent_processing": int(os.getenv("MAX_CONCURRENT_PROCESSING", "5"))
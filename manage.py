@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Operator CLI bundling the diagnostic and maintenance scripts.
+
+Running every step from one process pays the interpreter start-up, the
+.env parse and the Supabase client set-up once instead of once per script.
+
+Usage:
+    python manage.py diagnose
+    python manage.py find-pending
+    python manage.py force <media_id>
+    python manage.py last-processed [--download PATH]
+"""
+
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def cmd_diagnose(args: argparse.Namespace) -> int:
+    """Print the pipeline diagnostic report."""
+    from diagnose_pending import diagnose_pending_images
+
+    has_pending = asyncio.run(diagnose_pending_images())
+    if has_pending:
+        print(f"\n💡 Force one with: python manage.py force <media_id>")
+    return 0
+
+def cmd_find_pending(args: argparse.Namespace) -> int:
+    """Report pending pipeline records and their source images."""
+    from find_pending_record import find_pending_records
+
+    find_pending_records()
+    return 0
+
+def cmd_force(args: argparse.Namespace) -> int:
+    """Process one image directly, bypassing the service."""
+    # Imported here so the other commands never load OpenCV and the processors
+    from force_process_image import force_process_specific_image
+
+    return 0 if force_process_specific_image(args.media_id) else 1
+
+def cmd_last_processed(args: argparse.Namespace) -> int:
+    """Show the most recently processed image, optionally downloading it."""
+    from get_last_processed import get_last_processed_image, download_last_processed_image
+
+    latest_image = get_last_processed_image()
+    if latest_image is None:
+        return 1
+
+    if args.download:
+        return 0 if download_last_processed_image(args.download) else 1
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one subcommand per operator task."""
+    parser = argparse.ArgumentParser(description="OnShelf image processor maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diagnose = subparsers.add_parser("diagnose", help="Check why images are not being processed")
+    diagnose.set_defaults(func=cmd_diagnose)
+
+    find_pending = subparsers.add_parser("find-pending", help="Inspect pending pipeline records")
+    find_pending.set_defaults(func=cmd_find_pending)
+
+    force = subparsers.add_parser("force", help="Process a specific image directly")
+    force.add_argument("media_id", help="media_id of the image to process")
+    force.set_defaults(func=cmd_force)
+
+    last_processed = subparsers.add_parser("last-processed", help="Show the last processed image")
+    last_processed.add_argument("--download", metavar="PATH",
+                                help="Also save the processed image to PATH")
+    last_processed.set_defaults(func=cmd_last_processed)
+
+    return parser
+
+def main(argv=None) -> int:
+    """Parse the command line and run the selected command."""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    # Block-buffer the reports; Python flushes at exit
+    sys.stdout.reconfigure(line_buffering=False)
+
+    sys.exit(main())
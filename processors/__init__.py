@@ -1,7 +1,9 @@
 """Image processing modules for OnShelf service."""
 
 from .enhanced_clahe import process_smart_enhancement
+from .runtime import configure_opencv
 
 __all__ = [
-    "process_smart_enhancement"
+    "process_smart_enhancement",
+    "configure_opencv"
 ] 
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""Mask building and mask-weighted blending shared by the legacy processors."""
+
+import cv2
+import numpy as np
+from typing import Optional
+
+from processors.scratch import ScratchBuffers
+
+# Float32 mask intermediates, reused across images of the same size
+_scratch = ScratchBuffers()
+
+
+def blend_by_mask(foreground: np.ndarray, background: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Blend two single-channel images by a per-pixel weight.
+    
+    Computes background + (foreground - background) * mask with OpenCV
+    arithmetic: one float32 intermediate, updated in place, and a saturating
+    conversion to uint8 at the end instead of a separate clip and astype.
+    
+    Args:
+        foreground: Image weighted by mask (uint8 or float32)
+        background: Image weighted by 1 - mask (uint8)
+        mask: float32 weights in [0, 1]
+        
+    Returns:
+        Blended uint8 image
+    """
+    blended = cv2.subtract(foreground, background, dtype=cv2.CV_32F)
+    cv2.multiply(blended, mask, dst=blended)
+    return cv2.add(blended, background, dtype=cv2.CV_8U)
+
+
+def mask_source(image: np.ndarray) -> np.ndarray:
+    """
+    Half-resolution copy of an image to compute a decision mask on.
+    
+    Masks only steer where a full-resolution effect is applied and are blurred
+    before use, so detecting them at half scale changes little while touching
+    a quarter of the pixels.
+    
+    Args:
+        image: Full-resolution image
+        
+    Returns:
+        Gaussian-downsampled image (cv2.pyrDown)
+    """
+    return cv2.pyrDown(image)
+
+
+def mask_ksize(ksize: int) -> int:
+    """
+    Odd kernel size covering the same area at mask_source's half scale.
+    
+    Args:
+        ksize: Odd kernel size at full resolution
+        
+    Returns:
+        Odd kernel size with half the radius
+    """
+    return (ksize // 2) // 2 * 2 + 1
+
+
+def smooth_mask(mask: np.ndarray, ksize: int, name: str, scale: float = 1.0) -> np.ndarray:
+    """
+    Convert a mask to float32 weights and Gaussian-blur them in place.
+    
+    The conversion and the blur share one scratch buffer, so the per-image
+    astype copy and blur output are not reallocated.
+    
+    Args:
+        mask: Boolean or uint8 mask (typically from mask_source)
+        ksize: Odd blur kernel size at the mask's scale
+        name: Scratch buffer name, unique per call site
+        scale: Factor mapping mask values to weights (1/255 for 0-255 masks)
+        
+    Returns:
+        Blurred float32 mask; overwritten by the next call with the same name
+    """
+    weights = _scratch.get(name, mask.shape, np.float32)
+    np.multiply(mask, np.float32(scale), out=weights)
+    return cv2.GaussianBlur(weights, (ksize, ksize), 0, dst=weights)
+
+
+def upscale_mask(mask: np.ndarray, shape: tuple, name: Optional[str] = None) -> np.ndarray:
+    """
+    Resize a mask built on mask_source back to full resolution.
+    
+    Args:
+        mask: Half-resolution mask
+        shape: Full-resolution image shape
+        name: Scratch buffer to resize into; a new array is returned if None
+        
+    Returns:
+        Bilinearly upsampled mask of shape[:2]
+    """
+    height, width = shape[:2]
+    dst = _scratch.get(name, (height, width), mask.dtype) if name else None
+    return cv2.resize(mask, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR)
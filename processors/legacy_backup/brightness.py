@@ -1,9 +1,16 @@
 """Brightness and contrast enhancement for optimal text reading."""
 
+import functools
 import cv2
 import numpy as np
 from typing import Tuple
 
+from processors.enhanced_clahe import image_quality_is_good
+from processors.scratch import ScratchBuffers
+
+# L-channel intermediates of process_brightness_enhancement, reused across images
+_scratch = ScratchBuffers()
+
 
 def enhance_for_text_reading(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     """
@@ -21,35 +28,39 @@ def enhance_for_text_reading(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     # Convert BGR to LAB color space
     lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
     
-    # Split LAB channels
-    l_channel, a_channel, b_channel = cv2.split(lab)
+    # Extract the L channel only
+    l_channel = cv2.extractChannel(lab, 0)
     
     # Apply CLAHE to L channel
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
     l_enhanced = clahe.apply(l_channel)
     
-    # Merge channels back
-    lab_enhanced = cv2.merge([l_enhanced, a_channel, b_channel])
+    # Apply gamma correction to L for additional brightness adjustment
+    gamma = 1.2
+    l_enhanced = apply_gamma_correction(l_enhanced, gamma)
     
-    # Convert back to BGR
-    enhanced = cv2.cvtColor(lab_enhanced, cv2.COLOR_LAB2BGR)
+    # Calculate enhancement metrics from the lightness before and after
+    original_brightness = float(l_channel.mean())
+    enhanced_brightness = float(l_enhanced.mean())
     
-    # Apply gamma correction for additional brightness adjustment
-    gamma = 1.2
-    enhanced = apply_gamma_correction(enhanced, gamma)
+    # Write L back in place; A and B stay where they are
+    cv2.insertChannel(l_enhanced, lab, 0)
     
-    # Calculate enhancement metrics
-    original_brightness = np.mean(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
-    enhanced_brightness = np.mean(cv2.cvtColor(enhanced, cv2.COLOR_BGR2GRAY))
+    # Convert back to BGR
+    enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
     
     metadata = {
         "brightness_enhancement": {
             "clahe_clip_limit": 2.0,
             "clahe_grid_size": "8x8",
             "gamma_correction": gamma,
-            "original_mean_brightness": float(original_brightness),
-            "enhanced_mean_brightness": float(enhanced_brightness),
-            "brightness_increase_percent": float((enhanced_brightness - original_brightness) / original_brightness * 100)
+            "original_mean_brightness": original_brightness,
+            "enhanced_mean_brightness": enhanced_brightness,
+            # An all-black frame has no brightness to increase relative to
+            "brightness_increase_percent": (
+                (enhanced_brightness - original_brightness) / original_brightness * 100
+                if original_brightness else 0.0
+            )
         }
     }
     
@@ -67,12 +78,29 @@ def apply_gamma_correction(image: np.ndarray, gamma: float = 1.0) -> np.ndarray:
     Returns:
         Gamma-corrected image
     """
-    # Build lookup table
-    inv_gamma = 1.0 / gamma
-    table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in range(256)]).astype("uint8")
-    
     # Apply gamma correction using lookup table
-    return cv2.LUT(image, table)
+    return cv2.LUT(image, _gamma_lut(gamma))
+
+
+def _gamma_lut(gamma: float) -> np.ndarray:
+    """
+    Return the 256-entry lookup table for a gamma correction.
+    
+    Args:
+        gamma: Gamma value (>1 brightens, <1 darkens)
+        
+    Returns:
+        Read-only uint8 lookup table, shared between calls
+    """
+    return _build_gamma_lut(round(gamma, 3))
+
+
+@functools.lru_cache(maxsize=32)
+def _build_gamma_lut(gamma: float) -> np.ndarray:
+    inv_gamma = 1.0 / gamma
+    table = (np.power(np.arange(256, dtype=np.float64) / 255.0, inv_gamma) * 255).astype(np.uint8)
+    table.setflags(write=False)
+    return table
 
 
 def adaptive_brightness_adjustment(image: np.ndarray) -> np.ndarray:
@@ -88,13 +116,10 @@ def adaptive_brightness_adjustment(image: np.ndarray) -> np.ndarray:
     # Convert to grayscale for analysis
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # Calculate histogram
-    hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-    
-    # Determine if image is dark or bright
-    total_pixels = gray.shape[0] * gray.shape[1]
-    dark_pixels = np.sum(hist[:85])  # Pixels with value < 85
-    dark_ratio = dark_pixels / total_pixels
+    # Determine if image is dark or bright. The ratio only feeds a coarse
+    # three-way decision, so every 4th pixel in each direction is enough
+    sample = gray[::4, ::4]
+    dark_ratio = np.count_nonzero(sample < 85) / sample.size  # Pixels with value < 85
     
     if dark_ratio > 0.5:
         # Image is predominantly dark, apply stronger brightening
@@ -119,36 +144,119 @@ def enhance_local_contrast(image: np.ndarray) -> np.ndarray:
     """
     # Convert to LAB
     lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-    l_channel, a_channel, b_channel = cv2.split(lab)
+    l_channel = cv2.extractChannel(lab, 0)
+    
+    # Reduce noise while preserving edges
+    l_filtered = edge_preserving_smooth(l_channel)
+    
+    # Enhance contrast (back into the L buffer)
+    cv2.normalize(l_filtered, l_channel, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    
+    # Write L back and convert
+    cv2.insertChannel(l_channel, lab, 0)
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+
+def edge_preserving_smooth(l_channel: np.ndarray, radius: int = 4, eps: float = 25.0 ** 2) -> np.ndarray:
+    """
+    Smooth a single-channel image while preserving edges, in O(N).
     
-    # Apply bilateral filter to reduce noise while preserving edges
-    l_filtered = cv2.bilateralFilter(l_channel, 9, 75, 75)
+    Self-guided filter used in place of bilateralFilter(9, 75, 75), whose cost
+    grows with the window area. Uses cv2.ximgproc.guidedFilter when
+    opencv-contrib is installed, otherwise a fast guided filter (coefficients
+    computed at quarter resolution and upsampled) built from box filters.
     
-    # Enhance contrast
-    l_enhanced = cv2.normalize(l_filtered, None, 0, 255, cv2.NORM_MINMAX)
+    Args:
+        l_channel: 8-bit single-channel image
+        radius: Filter radius in pixels at full resolution
+        eps: Regularization; edges with variance well above eps are kept
+        
+    Returns:
+        Smoothed image (uint8 from ximgproc, float32 otherwise)
+    """
+    if hasattr(cv2, "ximgproc"):
+        return cv2.ximgproc.guidedFilter(l_channel, l_channel, radius, eps)
     
-    # Merge and convert back
-    lab_enhanced = cv2.merge([l_enhanced, a_channel, b_channel])
-    return cv2.cvtColor(lab_enhanced, cv2.COLOR_LAB2BGR)
+    height, width = l_channel.shape[:2]
+    guide = l_channel.astype(np.float32)
+    small = cv2.resize(guide, (max(1, width // 4), max(1, height // 4)), interpolation=cv2.INTER_AREA)
+    window = (2 * max(1, radius // 4) + 1,) * 2
+    
+    mean = cv2.boxFilter(small, -1, window)
+    variance = cv2.boxFilter(small * small, -1, window) - mean * mean
+    a = variance / (variance + eps)
+    b = mean - a * mean
+    
+    a = cv2.resize(cv2.boxFilter(a, -1, window), (width, height), interpolation=cv2.INTER_LINEAR)
+    b = cv2.resize(cv2.boxFilter(b, -1, window), (width, height), interpolation=cv2.INTER_LINEAR)
+    return cv2.add(cv2.multiply(a, guide), b)
 
 
-def process_brightness_enhancement(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+def process_brightness_enhancement(lab: np.ndarray) -> Tuple[np.ndarray, dict]:
     """
     Complete brightness and contrast enhancement pipeline.
     
+    Images whose lightness already passes image_quality_is_good are returned
+    unchanged. Otherwise applies the steps of enhance_for_text_reading,
+    adaptive_brightness_adjustment and enhance_local_contrast in order to the
+    L channel.
+    
     Args:
-        image: Input image
+        lab: Input image in LAB format; its L channel is updated in place
         
     Returns:
-        Tuple of (processed_image, metadata)
+        Tuple of (processed_lab, metadata)
     """
-    # First apply CLAHE and gamma correction
-    enhanced, metadata = enhance_for_text_reading(image)
+    height, width = lab.shape[:2]
+    l_channel = _scratch.get("l", (height, width))
+    l_tmp = _scratch.get("l_tmp", (height, width))
+    cv2.extractChannel(lab, 0, l_channel)
+    
+    # Leave images that already have good contrast and sharpness untouched
+    is_good_quality, quality_metrics = image_quality_is_good(l_channel)
+    if is_good_quality:
+        return lab, {"brightness_enhancement": {"skipped": True, "quality": quality_metrics}}
     
-    # Apply adaptive brightness if needed
-    enhanced = adaptive_brightness_adjustment(enhanced)
+    original_brightness = float(np.mean(l_channel))
+    
+    # Apply CLAHE to L channel
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    clahe.apply(l_channel, l_tmp)
+    
+    # Text-reading gamma. Its effect on brightness and darkness is read off the
+    # histogram so the gamma pass itself can be merged with the adaptive one
+    gamma = 1.2
+    table = _gamma_lut(gamma)
+    hist = np.bincount(l_tmp.ravel(), minlength=256)
+    enhanced_brightness = float(hist @ table) / l_tmp.size
+    dark_ratio = float(hist[table < 85].sum()) / l_tmp.size  # Pixels with value < 85
     
-    # Finally enhance local contrast
-    enhanced = enhance_local_contrast(enhanced)
+    # Adaptive brightness: compose the second gamma into the same table
+    if dark_ratio > 0.5:
+        # Image is predominantly dark, apply stronger brightening
+        table = _gamma_lut(1.5)[table]
+    elif dark_ratio > 0.3:
+        # Moderately dark
+        table = _gamma_lut(1.2)[table]
+    cv2.LUT(l_tmp, table, dst=l_channel)
+    
+    # Local contrast: reduce noise while preserving edges, then stretch
+    cv2.normalize(edge_preserving_smooth(l_channel), l_tmp, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    cv2.insertChannel(l_tmp, lab, 0)
+    
+    metadata = {
+        "brightness_enhancement": {
+            "clahe_clip_limit": 2.0,
+            "clahe_grid_size": "8x8",
+            "gamma_correction": gamma,
+            "original_mean_brightness": original_brightness,
+            "enhanced_mean_brightness": enhanced_brightness,
+            # An all-black frame has no brightness to increase relative to
+            "brightness_increase_percent": (
+                (enhanced_brightness - original_brightness) / original_brightness * 100
+                if original_brightness else 0.0
+            )
+        }
+    }
     
-    return enhanced, metadata 
\ No newline at end of file
+    return lab, metadata
\ No newline at end of file
@@ -2,10 +2,24 @@
 
 import cv2
 import numpy as np
-from typing import Tuple
+from typing import Callable, Tuple
 
+from processors.legacy_backup.blending import blend_by_mask, mask_ksize, mask_source, smooth_mask, upscale_mask
+from processors.legacy_backup.brightness import edge_preserving_smooth
 
-def reduce_glare(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+# reduce_glare median-filters only the glare regions unless their bounding boxes
+# cover more than this fraction of the image
+GLARE_ROI_MAX_FRACTION = 0.3
+
+# Structuring element for cleaning up the glare mask, built once
+GLARE_MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+# process_glare_reduction stops after reduce_glare when less than this
+# percentage of the image is glare
+GLARE_SKIP_PERCENTAGE = 0.5
+
+
+def reduce_glare(l_channel: np.ndarray) -> Tuple[np.ndarray, dict]:
     """
     Reduce glare and reflections from glass doors and bright surfaces.
     
@@ -13,37 +27,24 @@ def reduce_glare(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     median filtering while preserving edges and text details.
     
     Args:
-        image: Input image in BGR format
+        l_channel: L channel of the input image in LAB format
         
     Returns:
-        Tuple of (processed_image, metadata)
+        Tuple of (processed_l_channel, metadata)
     """
-    # Convert to LAB color space
-    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-    l_channel, a_channel, b_channel = cv2.split(lab)
-    
     # Detect glare areas (very bright spots)
     glare_threshold = 220
     glare_mask = (l_channel > glare_threshold).astype(np.uint8) * 255
     
     # Use morphological operations for precise glare detection
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-    glare_mask = cv2.morphologyEx(glare_mask, cv2.MORPH_CLOSE, kernel)
-    glare_mask = cv2.morphologyEx(glare_mask, cv2.MORPH_OPEN, kernel)
+    glare_mask = cv2.morphologyEx(glare_mask, cv2.MORPH_CLOSE, GLARE_MORPH_KERNEL)
+    glare_mask = cv2.morphologyEx(glare_mask, cv2.MORPH_OPEN, GLARE_MORPH_KERNEL)
     
     # Dilate mask slightly to cover glare edges
-    glare_mask = cv2.dilate(glare_mask, kernel, iterations=1)
+    glare_mask = cv2.dilate(glare_mask, GLARE_MORPH_KERNEL, iterations=1)
     
-    # Apply median filter to glare areas
-    l_filtered = cv2.medianBlur(l_channel, 9)
-    
-    # Blend filtered and original based on mask
-    glare_mask_norm = glare_mask.astype(np.float32) / 255.0
-    l_result = (l_filtered * glare_mask_norm + l_channel * (1 - glare_mask_norm)).astype(np.uint8)
-    
-    # Merge channels back
-    lab_result = cv2.merge([l_result, a_channel, b_channel])
-    result = cv2.cvtColor(lab_result, cv2.COLOR_LAB2BGR)
+    # Replace glare areas with their median-filtered values
+    l_result = median_filter_masked(l_channel, glare_mask, 9)
     
     # Calculate glare metrics
     total_pixels = l_channel.shape[0] * l_channel.shape[1]
@@ -59,113 +60,191 @@ def reduce_glare(image: np.ndarray) -> Tuple[np.ndarray, dict]:
         }
     }
     
-    return result, metadata
+    return l_result, metadata
 
 
-def reduce_specular_highlights(image: np.ndarray) -> np.ndarray:
+def filter_masked_regions(l_channel: np.ndarray, mask: np.ndarray, pad: int,
+                          region_filter: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> np.ndarray:
     """
-    Reduce specular highlights while preserving texture details.
+    Apply a filter only around the pixels where mask is set.
+    
+    Glare and highlights usually cover a few percent of a shelf photo, so the
+    filter is run on each masked region's bounding box, padded by the filter's
+    reach so the result matches filtering the whole image. Falls back to one
+    full-image pass when the boxes cover more than GLARE_ROI_MAX_FRACTION.
     
     Args:
-        image: Input image
+        l_channel: Single-channel uint8 image
+        mask: Binary uint8 mask (0 or 255)
+        pad: Pixels beyond the mask that the filter reads
+        region_filter: Called as region_filter(image, mask) on l_channel and
+            mask (or matching crops of them); returns the filtered image
         
     Returns:
-        Processed image
+        Copy of l_channel with masked pixels replaced by their filtered values
     """
-    # Convert to HSV for better highlight detection
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    h, s, v = cv2.split(hsv)
+    result = l_channel.copy()
+    height, width = l_channel.shape[:2]
+    
+    if not cv2.countNonZero(mask):
+        return result
+    
+    # Bounding boxes of the outer contours are those of the connected
+    # components, and much cheaper to find than connectedComponentsWithStats
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    regions = [cv2.boundingRect(contour) for contour in contours]
+    
+    if sum(w * h for _, _, w, h in regions) > GLARE_ROI_MAX_FRACTION * l_channel.size:
+        np.copyto(result, region_filter(l_channel, mask), where=mask > 0)
+        return result
+    
+    for x, y, w, h in regions:
+        # Padded region to filter, and the region's offset within it
+        x0, y0 = max(x - pad, 0), max(y - pad, 0)
+        x1, y1 = min(x + w + pad, width), min(y + h + pad, height)
+        filtered = region_filter(l_channel[y0:y1, x0:x1], mask[y0:y1, x0:x1])
+        
+        np.copyto(result[y:y + h, x:x + w], filtered[y - y0:y - y0 + h, x - x0:x - x0 + w],
+                  where=mask[y:y + h, x:x + w] > 0)
     
-    # Detect specular highlights (high value, low saturation)
-    highlight_mask = ((v > 240) & (s < 30)).astype(np.uint8) * 255
+    return result
+
+
+def median_filter_masked(l_channel: np.ndarray, mask: np.ndarray, ksize: int) -> np.ndarray:
+    """
+    Median-filter only the pixels where mask is set.
     
-    # Apply inpainting to remove highlights
-    result = cv2.inpaint(image, highlight_mask, 3, cv2.INPAINT_TELEA)
+    Args:
+        l_channel: Single-channel uint8 image
+        mask: Binary uint8 mask (0 or 255)
+        ksize: Median kernel size
+        
+    Returns:
+        Copy of l_channel with masked pixels replaced by their median
+    """
+    return filter_masked_regions(l_channel, mask, ksize // 2,
+                                 lambda image, _: cv2.medianBlur(image, ksize))
+
+
+def reduce_specular_highlights(l_channel: np.ndarray, lab: np.ndarray) -> np.ndarray:
+    """
+    Reduce specular highlights while preserving texture details.
     
-    return result
+    Args:
+        l_channel: L channel to process
+        lab: LAB image the L channel belongs to; its a/b channels identify
+            colourless pixels
+        
+    Returns:
+        Processed L channel
+    """
+    # Detect specular highlights (very light and close to neutral grey,
+    # the LAB counterpart of high value and low saturation in HSV)
+    highlight_mask = cv2.compare(l_channel, 240, cv2.CMP_GT)
+    if not cv2.countNonZero(highlight_mask):
+        # Most photos have no highlights; skip the chroma test and inpainting
+        return l_channel
+    
+    chroma = cv2.add(cv2.absdiff(lab[:, :, 1], 128), cv2.absdiff(lab[:, :, 2], 128))
+    cv2.bitwise_and(highlight_mask, cv2.compare(chroma, 16, cv2.CMP_LT), dst=highlight_mask)
+    
+    # Inpaint the highlights; Telea reads pixels up to the inpaint radius
+    # away, so only the area around each highlight is processed
+    inpaint_radius = 3
+    return filter_masked_regions(l_channel, highlight_mask, inpaint_radius + 1,
+                                 lambda image, mask: cv2.inpaint(image, mask, inpaint_radius, cv2.INPAINT_TELEA))
 
 
-def adaptive_glare_reduction(image: np.ndarray) -> np.ndarray:
+def adaptive_glare_reduction(l_channel: np.ndarray) -> np.ndarray:
     """
     Apply adaptive glare reduction based on local image statistics.
     
     Args:
-        image: Input image
+        l_channel: L channel of the image in LAB format
         
     Returns:
-        Processed image
+        Processed L channel
     """
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # The glare mask is detected at half resolution
+    small = mask_source(l_channel)
     
-    # Calculate local mean and standard deviation
-    kernel_size = 31
-    local_mean = cv2.blur(gray, (kernel_size, kernel_size))
-    gray_squared = gray.astype(np.float32) ** 2
-    local_mean_squared = cv2.blur(gray_squared, (kernel_size, kernel_size))
-    local_std = np.sqrt(np.maximum(local_mean_squared - local_mean.astype(np.float32) ** 2, 0))
+    # Calculate local variance as E[x^2] - E[x]^2 over a 31x31 full-resolution
+    # window; sqrBoxFilter averages the squares without materializing them
+    kernel_size = mask_ksize(31)
+    local_mean = cv2.boxFilter(small, cv2.CV_32F, (kernel_size, kernel_size))
+    local_variance = cv2.sqrBoxFilter(small, cv2.CV_32F, (kernel_size, kernel_size))
+    cv2.subtract(local_variance, cv2.multiply(local_mean, local_mean, dst=local_mean), dst=local_variance)
     
     # Detect glare as areas with high brightness and low local contrast
-    glare_mask = ((gray > 200) & (local_std < 20)).astype(np.float32)
+    # (standard deviation below 20, compared as variance to skip the sqrt)
+    glare_mask = cv2.compare(small, 200, cv2.CMP_GT)
+    cv2.bitwise_and(glare_mask, cv2.compare(local_variance, 20 ** 2, cv2.CMP_LT), dst=glare_mask)
     
-    # Smooth the mask
-    glare_mask = cv2.GaussianBlur(glare_mask, (15, 15), 0)
+    # Smooth the mask and bring it back to full resolution
+    glare_mask = smooth_mask(glare_mask, mask_ksize(15), "glare_mask", scale=1 / 255.0)
+    glare_mask = upscale_mask(glare_mask, l_channel.shape, "glare_weights")
     
     # Apply bilateral filter to reduce glare while preserving edges
-    filtered = cv2.bilateralFilter(image, 9, 75, 75)
+    filtered = cv2.bilateralFilter(l_channel, 9, 75, 75)
     
     # Blend based on mask
-    result = np.zeros_like(image, dtype=np.float32)
-    for i in range(3):
-        result[:, :, i] = filtered[:, :, i] * glare_mask + image[:, :, i] * (1 - glare_mask)
-    
-    return np.clip(result, 0, 255).astype(np.uint8)
+    return blend_by_mask(filtered, l_channel, glare_mask)
 
 
-def remove_reflections(image: np.ndarray) -> np.ndarray:
+def remove_reflections(l_channel: np.ndarray) -> np.ndarray:
     """
     Remove reflections from glass surfaces using edge-preserving filtering.
     
     Args:
-        image: Input image
+        l_channel: L channel of the image in LAB format
         
     Returns:
-        Processed image
+        Processed L channel
     """
-    # Apply guided filter to remove reflections while preserving edges
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # Use guided filter (approximated with edge-preserving filter)
-    filtered = cv2.edgePreservingFilter(image, flags=2, sigma_s=60, sigma_r=0.4)
-    
-    # Detect reflection areas (bright with low texture)
-    edges = cv2.Canny(gray, 50, 150)
-    reflection_mask = ((gray > 180) & (edges == 0)).astype(np.float32)
-    reflection_mask = cv2.GaussianBlur(reflection_mask, (21, 21), 0)
+    # Smooth with a guided filter (edgePreservingFilter only takes 3-channel
+    # images); eps matches its sigma_r=0.4 on the 0-255 scale
+    filtered = edge_preserving_smooth(l_channel, radius=8, eps=(0.4 * 255) ** 2)
+    
+    # Detect reflection areas (bright with low texture) at half resolution
+    small = mask_source(l_channel)
+    edges = cv2.Canny(small, 50, 150)
+    reflection_mask = cv2.compare(small, 180, cv2.CMP_GT)
+    cv2.bitwise_and(reflection_mask, cv2.bitwise_not(edges, dst=edges), dst=reflection_mask)
+    reflection_mask = smooth_mask(reflection_mask, mask_ksize(21), "reflection_mask", scale=1 / 255.0)
+    reflection_mask = upscale_mask(reflection_mask, l_channel.shape, "reflection_weights")
     
     # Blend filtered and original
-    result = np.zeros_like(image, dtype=np.float32)
-    for i in range(3):
-        result[:, :, i] = filtered[:, :, i] * reflection_mask + image[:, :, i] * (1 - reflection_mask)
-    
-    return np.clip(result, 0, 255).astype(np.uint8)
+    return blend_by_mask(filtered, l_channel, reflection_mask)
 
 
-def process_glare_reduction(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+def process_glare_reduction(lab: np.ndarray) -> Tuple[np.ndarray, dict]:
     """
     Complete glare and reflection reduction pipeline.
     
+    Every step works on lightness only, so the L channel is extracted once and
+    written back once. Images with almost no glare skip the specular,
+    adaptive and reflection steps.
+    
     Args:
-        image: Input image
+        lab: Input image in LAB format; its L channel is updated in place
         
     Returns:
-        Tuple of (processed_image, metadata)
+        Tuple of (processed_lab, metadata)
     """
+    l_channel = cv2.extractChannel(lab, 0)
+    
     # Apply main glare reduction
-    processed, metadata = reduce_glare(image)
+    processed, metadata = reduce_glare(l_channel)
+    
+    if metadata["glare_reduction"]["glare_percentage"] < GLARE_SKIP_PERCENTAGE:
+        cv2.insertChannel(processed, lab, 0)
+        metadata["glare_reduction"]["specular_removal"] = False
+        metadata["glare_reduction"]["adaptive_reduction"] = False
+        metadata["glare_reduction"]["reflection_removal"] = False
+        return lab, metadata
     
     # Remove specular highlights
-    processed = reduce_specular_highlights(processed)
+    processed = reduce_specular_highlights(processed, lab)
     
     # Apply adaptive glare reduction
     processed = adaptive_glare_reduction(processed)
@@ -173,9 +252,11 @@ def process_glare_reduction(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     # Remove reflections
     processed = remove_reflections(processed)
     
+    cv2.insertChannel(processed, lab, 0)
+    
     # Update metadata
     metadata["glare_reduction"]["specular_removal"] = True
     metadata["glare_reduction"]["adaptive_reduction"] = True
     metadata["glare_reduction"]["reflection_removal"] = True
     
-    return processed, metadata 
\ No newline at end of file
+    return lab, metadata 
\ No newline at end of file
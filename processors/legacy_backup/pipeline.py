@@ -0,0 +1,41 @@
+"""The original five-stage enhancement pipeline, kept for rollback."""
+
+import cv2
+import numpy as np
+from typing import Tuple
+
+from processors.legacy_backup.rotation import process_rotation
+from processors.legacy_backup.brightness import process_brightness_enhancement
+from processors.legacy_backup.shadows import process_shadow_enhancement
+from processors.legacy_backup.glare import process_glare_reduction
+from processors.legacy_backup.sharpening import process_text_sharpening
+
+
+def process_legacy_pipeline(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+    """
+    Run rotation, brightness, shadow, glare and sharpening stages in order.
+    
+    The four enhancement stages all adjust lightness, so they share one LAB
+    copy of the rotated image: it is converted from BGR once after rotation
+    and back once at the end, instead of by every stage.
+    
+    Args:
+        image: Input image in BGR format
+        
+    Returns:
+        Tuple of (processed_image, metadata)
+    """
+    metadata = {"processing_stages": ["rotation", "brightness", "shadows", "glare", "sharpening"]}
+    
+    # Rotation is geometric, so it runs on the BGR image
+    rotated, stage_metadata = process_rotation(image)
+    metadata.update(stage_metadata)
+    
+    lab = cv2.cvtColor(rotated, cv2.COLOR_BGR2LAB)
+    
+    for stage in (process_brightness_enhancement, process_shadow_enhancement,
+                  process_glare_reduction, process_text_sharpening):
+        lab, stage_metadata = stage(lab)
+        metadata.update(stage_metadata)
+    
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR), metadata
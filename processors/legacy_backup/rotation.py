@@ -1,10 +1,13 @@
 """Rotation detection and correction using Hough Line Transform."""
 
+import functools
 import cv2
 import numpy as np
 from typing import Tuple, Optional
 import math
 
+from processors.legacy_backup.blending import mask_source
+
 
 def detect_shelf_rotation(image: np.ndarray) -> float:
     """
@@ -23,38 +26,31 @@ def detect_shelf_rotation(image: np.ndarray) -> float:
     # Convert to grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
-    # Apply Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    # Angles do not depend on scale, so detect lines at half resolution;
+    # pyrDown's Gaussian also stands in for the noise-reduction blur
+    blurred = mask_source(gray)
     
     # Edge detection using Canny
     edges = cv2.Canny(blurred, 50, 150)
     
-    # Detect lines using Hough Transform
+    # Detect lines using Hough Transform. The threshold is kept at its
+    # full-resolution value: lowered in proportion it admits short lines whose
+    # 1-degree bins spread the median
     lines = cv2.HoughLines(edges, rho=1, theta=np.pi/180, threshold=100)
     
     if lines is None:
         return 0.0
     
-    # Extract angles of detected lines
-    angles = []
+    # Convert theta of every line to degrees
+    angle_deg = lines[:, 0, 1] * (180 / np.pi)
     
-    for line in lines:
-        rho, theta = line[0]
-        
-        # Convert theta to degrees
-        angle_deg = theta * 180 / np.pi
-        
-        # Filter for approximately horizontal lines (80-100 degrees or 260-280 degrees)
-        if (80 <= angle_deg <= 100) or (260 <= angle_deg <= 280):
-            # Normalize angle to deviation from horizontal
-            if angle_deg > 180:
-                deviation = angle_deg - 270
-            else:
-                deviation = angle_deg - 90
-            
-            angles.append(deviation)
-    
-    if not angles:
+    # Filter for approximately horizontal lines (80-100 degrees or 260-280 degrees)
+    horizontal = ((angle_deg >= 80) & (angle_deg <= 100)) | ((angle_deg >= 260) & (angle_deg <= 280))
+    
+    # Normalize angle to deviation from horizontal
+    angles = np.where(angle_deg > 180, angle_deg - 270, angle_deg - 90)[horizontal]
+    
+    if angles.size == 0:
         return 0.0
     
     # Calculate median angle for robustness against outliers
@@ -66,10 +62,11 @@ def detect_shelf_rotation(image: np.ndarray) -> float:
 
 def apply_rotation(image: np.ndarray, angle: float) -> np.ndarray:
     """
-    Apply rotation correction to image.
+    Apply rotation correction to image, cropped to the rotated content.
     
-    Rotates the image by the specified angle, using border reflection
-    to minimize data loss at edges.
+    Rotates the image by the specified angle straight into the largest
+    centred axis-aligned rectangle that lies inside the rotated frame, so no
+    border is produced and no separate crop pass is needed.
     
     Args:
         image: Input image
@@ -79,35 +76,56 @@ def apply_rotation(image: np.ndarray, angle: float) -> np.ndarray:
         Rotated image
     """
     # Ensure angle is within limits
-    angle = np.clip(angle, -10, 10)
+    angle = float(np.clip(angle, -10, 10))
     
     # Get image dimensions
     height, width = image.shape[:2]
-    center = (width // 2, height // 2)
+    rotation_matrix, output_size, border_mode = _rotation_transform(width, height, round(angle, 2))
     
-    # Get rotation matrix
-    rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    return cv2.warpAffine(image, rotation_matrix, output_size, borderMode=border_mode)
+
+
+@functools.lru_cache(maxsize=64)
+def _rotation_transform(width: int, height: int, angle: float) -> Tuple[np.ndarray, Tuple[int, int], int]:
+    """
+    Rotation matrix, output size and border mode for apply_rotation.
     
-    # Calculate new image bounds to prevent cropping
-    cos = np.abs(rotation_matrix[0, 0])
-    sin = np.abs(rotation_matrix[0, 1])
+    Camera resolutions repeat and angles come from 1-degree Hough bins, so the
+    geometry is cached per (width, height, angle).
     
-    new_width = int((height * sin) + (width * cos))
-    new_height = int((height * cos) + (width * sin))
+    Args:
+        width: Input width
+        height: Input height
+        angle: Rotation angle in degrees
+        
+    Returns:
+        Tuple of (read-only 2x3 matrix, (width, height), border mode)
+    """
+    center = (width / 2, height / 2)
     
-    # Adjust rotation matrix for translation
+    # Get rotation matrix
+    rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    cos = abs(rotation_matrix[0, 0])
+    sin = abs(rotation_matrix[0, 1])
+    
+    # Largest centred rectangle inside the rotated frame (valid for |angle| < 45)
+    new_width = int(width * cos - height * sin)
+    new_height = int(height * cos - width * sin)
+    border_mode = cv2.BORDER_REPLICATE
+    
+    if new_width <= 0 or new_height <= 0:
+        # Very elongated images have no such rectangle; keep the whole rotated
+        # frame and fill the corners by reflection instead
+        new_width = int((height * sin) + (width * cos))
+        new_height = int((height * cos) + (width * sin))
+        border_mode = cv2.BORDER_REFLECT
+    
+    # Adjust rotation matrix so the output is centred on the image centre
     rotation_matrix[0, 2] += (new_width / 2) - center[0]
     rotation_matrix[1, 2] += (new_height / 2) - center[1]
+    rotation_matrix.setflags(write=False)
     
-    # Apply rotation with border reflection
-    rotated = cv2.warpAffine(
-        image, 
-        rotation_matrix, 
-        (new_width, new_height),
-        borderMode=cv2.BORDER_REFLECT
-    )
-    
-    return rotated
+    return rotation_matrix, (new_width, new_height), border_mode
 
 
 def auto_crop_borders(image: np.ndarray, threshold: int = 10) -> np.ndarray:
@@ -158,11 +176,9 @@ def process_rotation(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     # Detect rotation angle
     angle = detect_shelf_rotation(image)
     
-    # Apply rotation if needed
+    # Apply rotation if needed (already cropped to the rotated content)
     if abs(angle) > 0.5:  # Only rotate if angle is significant
-        rotated = apply_rotation(image, angle)
-        # Auto-crop borders
-        processed = auto_crop_borders(rotated)
+        processed = apply_rotation(image, angle)
     else:
         processed = image
         angle = 0.0
@@ -4,8 +4,14 @@ import cv2
 import numpy as np
 from typing import Tuple
 
+from processors.legacy_backup.blending import mask_ksize, mask_source, smooth_mask, upscale_mask
 
-def enhance_shadows(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+# process_shadow_enhancement stops after enhance_shadows when less than this
+# percentage of the image is shadow
+SHADOW_SKIP_PERCENTAGE = 2.0
+
+
+def enhance_shadows(l_channel: np.ndarray) -> Tuple[np.ndarray, dict]:
     """
     Enhance shadow areas to reveal details in dark shelving units.
     
@@ -13,39 +19,32 @@ def enhance_shadows(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     preserving highlights, using smooth blending for natural results.
     
     Args:
-        image: Input image in BGR format
+        l_channel: L channel of the input image in LAB format
         
     Returns:
-        Tuple of (enhanced_image, metadata)
+        Tuple of (enhanced_l_channel, metadata)
     """
-    # Convert to grayscale for shadow detection
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # Create shadow mask (threshold at 30% of max brightness)
+    # Create shadow mask (threshold at 30% of max brightness) at half resolution
+    # and blur it for smooth transitions
     shadow_threshold = 0.3 * 255
-    shadow_mask = (gray < shadow_threshold).astype(np.float32)
+    shadow_mask = smooth_mask(mask_source(l_channel) < shadow_threshold, mask_ksize(21), "shadow_mask")
     
-    # Apply Gaussian blur to shadow mask for smooth transitions
-    shadow_mask = cv2.GaussianBlur(shadow_mask, (21, 21), 0)
+    # Calculate enhancement metrics before the mask becomes the map
+    shadow_pixels = np.sum(shadow_mask > 0.5)
+    total_pixels = shadow_mask.shape[0] * shadow_mask.shape[1]
+    shadow_percentage = (shadow_pixels / total_pixels) * 100
     
     # Enhancement factor for shadows
     shadow_factor = 1.8
     
-    # Create enhancement map
-    enhancement_map = 1.0 + (shadow_mask * (shadow_factor - 1.0))
+    # Turn the mask into the enhancement map in place and bring it back to
+    # full resolution
+    shadow_mask *= shadow_factor - 1.0
+    shadow_mask += 1.0
+    enhancement_map = upscale_mask(shadow_mask, l_channel.shape, "shadow_map")
     
-    # Apply enhancement to each channel
-    enhanced = np.zeros_like(image, dtype=np.float32)
-    for i in range(3):
-        enhanced[:, :, i] = image[:, :, i] * enhancement_map
-    
-    # Clip values to valid range
-    enhanced = np.clip(enhanced, 0, 255).astype(np.uint8)
-    
-    # Calculate enhancement metrics
-    shadow_pixels = np.sum(shadow_mask > 0.5)
-    total_pixels = gray.shape[0] * gray.shape[1]
-    shadow_percentage = (shadow_pixels / total_pixels) * 100
+    # Apply enhancement to the lightness only, saturating to the valid range
+    enhanced = cv2.multiply(l_channel, enhancement_map, dtype=cv2.CV_8U)
     
     metadata = {
         "shadow_enhancement": {
@@ -59,52 +58,42 @@ def enhance_shadows(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     return enhanced, metadata
 
 
-def adjust_highlights(image: np.ndarray, highlight_factor: float = 0.9) -> np.ndarray:
+def adjust_highlights(l_channel: np.ndarray, highlight_factor: float = 0.9) -> np.ndarray:
     """
     Reduce brightness of highlight areas to balance with enhanced shadows.
     
     Args:
-        image: Input image
+        l_channel: L channel of the image in LAB format
         highlight_factor: Factor to reduce highlights (< 1.0)
         
     Returns:
-        Adjusted image
+        Adjusted L channel
     """
-    # Convert to grayscale for highlight detection
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # Create highlight mask (threshold at 80% of max brightness)
+    # Create highlight mask (threshold at 80% of max brightness) at half resolution
+    # and blur it for smooth transitions
     highlight_threshold = 0.8 * 255
-    highlight_mask = (gray > highlight_threshold).astype(np.float32)
-    
-    # Blur mask for smooth transitions
-    highlight_mask = cv2.GaussianBlur(highlight_mask, (15, 15), 0)
-    
-    # Create adjustment map
-    adjustment_map = 1.0 - (highlight_mask * (1.0 - highlight_factor))
+    highlight_mask = smooth_mask(mask_source(l_channel) > highlight_threshold, mask_ksize(15), "highlight_mask")
     
-    # Apply adjustment
-    adjusted = np.zeros_like(image, dtype=np.float32)
-    for i in range(3):
-        adjusted[:, :, i] = image[:, :, i] * adjustment_map
+    # Turn the mask into the adjustment map in place and bring it back to
+    # full resolution
+    highlight_mask *= -(1.0 - highlight_factor)
+    highlight_mask += 1.0
+    adjustment_map = upscale_mask(highlight_mask, l_channel.shape, "highlight_map")
     
-    return np.clip(adjusted, 0, 255).astype(np.uint8)
+    # Apply adjustment, saturating to the valid range
+    return cv2.multiply(l_channel, adjustment_map, dtype=cv2.CV_8U)
 
 
-def adaptive_shadow_enhancement(image: np.ndarray) -> np.ndarray:
+def adaptive_shadow_enhancement(l_channel: np.ndarray) -> np.ndarray:
     """
     Apply adaptive shadow enhancement based on image histogram.
     
     Args:
-        image: Input image
+        l_channel: L channel of the image in LAB format
         
     Returns:
-        Enhanced image
+        Enhanced L channel
     """
-    # Convert to LAB color space
-    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-    l_channel, a_channel, b_channel = cv2.split(lab)
-    
     # Calculate histogram of L channel
     hist = cv2.calcHist([l_channel], [0], None, [256], [0, 256])
     
@@ -125,26 +114,34 @@ def adaptive_shadow_enhancement(image: np.ndarray) -> np.ndarray:
         enhanced_l = cv2.add(l_channel, 10)
         enhanced_l = cv2.multiply(enhanced_l, 1.1)
     
-    # Ensure values are in valid range
-    enhanced_l = np.clip(enhanced_l, 0, 255).astype(np.uint8)
-    
-    # Merge channels and convert back
-    enhanced_lab = cv2.merge([enhanced_l, a_channel, b_channel])
-    return cv2.cvtColor(enhanced_lab, cv2.COLOR_LAB2BGR)
+    # cv2.add and cv2.multiply already saturate to the uint8 range
+    return enhanced_l
 
 
-def process_shadow_enhancement(image: np.ndarray) -> Tuple[np.ndarray, dict]:
+def process_shadow_enhancement(lab: np.ndarray) -> Tuple[np.ndarray, dict]:
     """
     Complete shadow and highlight enhancement pipeline.
     
+    Every step adjusts lightness only, so the L channel is extracted once and
+    written back once. Images with almost no shadow skip the highlight and
+    adaptive steps.
+    
     Args:
-        image: Input image
+        lab: Input image in LAB format; its L channel is updated in place
         
     Returns:
-        Tuple of (processed_image, metadata)
+        Tuple of (processed_lab, metadata)
     """
+    l_channel = cv2.extractChannel(lab, 0)
+    
     # Apply main shadow enhancement
-    enhanced, metadata = enhance_shadows(image)
+    enhanced, metadata = enhance_shadows(l_channel)
+    
+    if metadata["shadow_enhancement"]["shadow_percentage"] < SHADOW_SKIP_PERCENTAGE:
+        cv2.insertChannel(enhanced, lab, 0)
+        metadata["shadow_enhancement"]["highlight_adjustment"] = False
+        metadata["shadow_enhancement"]["adaptive_enhancement"] = False
+        return lab, metadata
     
     # Balance highlights
     enhanced = adjust_highlights(enhanced)
@@ -152,8 +149,10 @@ def process_shadow_enhancement(image: np.ndarray) -> Tuple[np.ndarray, dict]:
     # Apply adaptive enhancement if needed
     enhanced = adaptive_shadow_enhancement(enhanced)
     
+    cv2.insertChannel(enhanced, lab, 0)
+    
     # Update metadata
     metadata["shadow_enhancement"]["highlight_adjustment"] = True
     metadata["shadow_enhancement"]["adaptive_enhancement"] = True
     
-    return enhanced, metadata 
\ No newline at end of file
+    return lab, metadata 
\ No newline at end of file
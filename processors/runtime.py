@@ -0,0 +1,42 @@
+"""OpenCV runtime configuration for the image processing workers."""
+
+import os
+import cv2
+from typing import Any, Dict, Optional
+
+from .enhanced_clahe import cuda_enabled
+
+
+def configure_opencv(threads: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Configure OpenCV threading and optimized code paths for this process.
+
+    OpenCV uses every core in each process by default, which oversubscribes the
+    CPU when several worker processes enhance images at once. Call this in the
+    service process and in each pool worker (after .env has been loaded).
+
+    Args:
+        threads: OpenCV threads for this process; defaults to the CPU count
+            divided by MAX_CONCURRENT_PROCESSING
+
+    Returns:
+        Effective settings, for logging
+    """
+    if threads is None:
+        concurrent = max(1, int(os.getenv("MAX_CONCURRENT_PROCESSING", "5")))
+        threads = max(1, (os.cpu_count() or 1) // concurrent)
+
+    cv2.setNumThreads(threads)
+    cv2.setUseOptimized(True)
+
+    # OpenCL only kicks in for cv2.UMat inputs (see apply_clahe); opt-in since
+    # a slow or missing device makes it a net loss
+    cv2.ocl.setUseOpenCL(os.getenv("OPENSHELF_USE_OPENCL") == "1" and cv2.ocl.haveOpenCL())
+
+    return {
+        "threads": cv2.getNumThreads(),
+        "optimized": cv2.useOptimized(),
+        "ipp": cv2.ipp.getIppVersion() if cv2.ipp.useIPP() else None,
+        "opencl": cv2.ocl.useOpenCL(),
+        "cuda": cuda_enabled()
+    }
@@ -0,0 +1,37 @@
+"""Reusable intermediate buffers for the image processors."""
+
+import threading
+import numpy as np
+from typing import Tuple
+
+
+class ScratchBuffers(threading.local):
+    """
+    Named intermediate arrays reused across calls on the same thread.
+
+    A buffer is only reallocated when the requested shape or dtype changes, so a
+    worker processing same-sized images allocates its intermediates once instead
+    of once per OpenCV call. Buffers are overwritten by the next call - never
+    return one to a caller.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Get the buffer called name with the given shape and dtype.
+
+        Args:
+            name: Buffer name, unique within the owning module
+            shape: Required array shape
+            dtype: Required array dtype
+
+        Returns:
+            Uninitialized array for use as an OpenCV dst argument
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
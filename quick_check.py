@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from database.supabase_client import SupabaseClient
+from database.supabase_client import MEDIA_FILES_TABLE, SupabaseClient
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
@@ -9,7 +9,7 @@ db = SupabaseClient()
 
 print('🔍 RECENT UPLOADS (last 1 hour):')
 recent = datetime.utcnow() - timedelta(hours=1)
-result = db.client.table('media_files').select('media_id,status,approval_status,created_at').gte('created_at', recent.isoformat()).order('created_at', desc=True).execute()
+result = db.client.table(MEDIA_FILES_TABLE).select('media_id,status,approval_status,created_at').gte('created_at', recent.isoformat()).order('created_at', desc=True).execute()
 
 for r in result.data:
     print(f'  {r["media_id"][:8]}... | {r["status"]} | {r["approval_status"]} | {r["created_at"][:19]}')
@@ -0,0 +1,27 @@
+-- OnShelf Image Processing Service - Performance Indexes
+-- Run this in your Supabase SQL Editor (statements run outside a transaction
+-- so CONCURRENTLY does not lock the tables while the indexes build)
+
+-- Pending-image poll: approval_status='approved' AND status='completed' ORDER BY created_at
+-- Partial index keeps only rows the service can ever pick up; the diagnostics'
+-- ORDER BY created_at DESC variants (diagnose_pipeline, pending_enhancements)
+-- use the same index scanned backward
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_media_files_pending
+ON public.media_files(approval_status, status, created_at)
+WHERE approval_status = 'approved' AND status = 'completed';
+
+-- Pipeline lookups: source_media_id = ? AND process_type = 'enhancement'
+-- Used by get_pending_images, every mark_as_* state transition and the
+-- per-image pipeline joins in the diagnostic functions
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_pipeline_source_type
+ON public.media_processing_pipeline(source_media_id, process_type);
+
+-- Recent-activity checks: process_type = ? AND process_status = ? AND updated_at >= ?
+-- ORDER BY updated_at DESC is answered by a single backward index scan
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pipeline_updated_at
+ON public.media_processing_pipeline(process_type, process_status, updated_at DESC);
+
+-- Recent-upload diagnostics: created_at >= cutoff ORDER BY created_at DESC
+-- (setup_pipeline_database.sql defines the same index; IF NOT EXISTS keeps this idempotent)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_media_files_created_at
+ON public.media_files(created_at);
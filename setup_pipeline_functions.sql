@@ -0,0 +1,176 @@
+-- OnShelf Image Processing Service - Pipeline Functions
+-- Run this in your Supabase SQL Editor after setup_performance_indexes.sql
+
+-- Images eligible for enhancement: approved, fully uploaded, and either never
+-- processed or left in a retryable state ('pending' / 'failed')
+CREATE OR REPLACE VIEW public.v_pending_enhancement AS
+SELECT
+    m.media_id,
+    m.file_path,
+    m.created_at
+FROM public.media_files m
+LEFT JOIN public.media_processing_pipeline p
+    ON p.source_media_id = m.media_id AND p.process_type = 'enhancement'
+WHERE m.approval_status = 'approved'
+  AND m.status = 'completed'
+  AND (p.pipeline_id IS NULL OR p.process_status IN ('pending', 'failed'));
+
+-- Oldest pending images first, exactly p_limit rows (used by get_pending_images)
+CREATE OR REPLACE FUNCTION public.get_pending_enhancement(p_limit integer DEFAULT 10)
+RETURNS TABLE (media_id uuid, file_path text, created_at timestamp with time zone)
+LANGUAGE sql STABLE
+AS $$
+    SELECT v.media_id, v.file_path, v.created_at
+    FROM public.v_pending_enhancement v
+    ORDER BY v.created_at
+    LIMIT p_limit;
+$$;
+
+-- Record a finished enhancement in one transaction: create the processed
+-- media_files row (inheriting upload metadata from the source image) and
+-- close out the pipeline record. Returns the new processed media_id.
+CREATE OR REPLACE FUNCTION public.finalize_pipeline(
+    p_media_id uuid,
+    p_processed_path text,
+    p_metadata jsonb
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_original_metadata jsonb;
+    v_original_file_path text;
+    v_processed_metadata jsonb;
+    v_processed_media_id uuid;
+BEGIN
+    SELECT COALESCE(metadata, '{}'::jsonb), COALESCE(file_path, '')
+    INTO v_original_metadata, v_original_file_path
+    FROM public.media_files
+    WHERE media_id = p_media_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Source image % not found', p_media_id;
+    END IF;
+
+    v_processed_metadata := jsonb_build_object(
+        'processed_from', p_media_id,
+        'processing_metadata', p_metadata,
+        'processor_version', '1.0.0',
+        'original_filename', CASE
+            WHEN v_original_file_path = '' THEN 'unknown.jpg'
+            ELSE regexp_replace(v_original_file_path, '^.*/', '')
+        END,
+        'original_file_path', v_original_file_path
+    ) || jsonb_strip_nulls(jsonb_build_object(
+        'upload_id', v_original_metadata->'upload_id',
+        'source_public_url', v_original_metadata->'public_url',
+        'original_size', v_original_metadata->'size',
+        'original_mime_type', v_original_metadata->'mime_type'
+    ));
+
+    INSERT INTO public.media_files (upload_id, file_path, file_type, status, metadata)
+    VALUES (
+        COALESCE(v_original_metadata->>'upload_id', 'processed-' || left(p_media_id::text, 8)),
+        p_processed_path,
+        'image',
+        'completed',
+        v_processed_metadata
+    )
+    RETURNING media_id INTO v_processed_media_id;
+
+    UPDATE public.media_processing_pipeline
+    SET process_status = 'completed',
+        output_media_id = v_processed_media_id,
+        process_results = p_metadata,
+        processing_time_ms = trunc(COALESCE((p_metadata->>'processing_time_seconds')::numeric, 0) * 1000)::integer
+    WHERE source_media_id = p_media_id AND process_type = 'enhancement';
+
+    RETURN v_processed_media_id;
+END;
+$$;
+
+-- Diagnostics snapshot for diagnose_pending.py: uploads since `cutoff` plus the
+-- newest p_ready_limit approved & completed images, each with its enhancement
+-- pipeline status. is_recent / is_ready tell the caller which section a row belongs to.
+CREATE OR REPLACE FUNCTION public.diagnose_pipeline(cutoff timestamp with time zone, p_ready_limit integer DEFAULT 10)
+RETURNS TABLE (
+    media_id uuid,
+    file_path text,
+    status text,
+    approval_status text,
+    created_at timestamp with time zone,
+    pipeline_id uuid,
+    process_status text,
+    is_recent boolean,
+    is_ready boolean
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH ready AS (
+        SELECT m.media_id
+        FROM public.media_files m
+        WHERE m.approval_status = 'approved' AND m.status = 'completed'
+        ORDER BY m.created_at DESC
+        LIMIT p_ready_limit
+    )
+    SELECT
+        m.media_id,
+        m.file_path,
+        m.status,
+        m.approval_status,
+        m.created_at,
+        p.pipeline_id,
+        p.process_status,
+        m.created_at >= cutoff AS is_recent,
+        m.media_id IN (SELECT r.media_id FROM ready r) AS is_ready
+    FROM public.media_files m
+    LEFT JOIN public.media_processing_pipeline p
+        ON p.source_media_id = m.media_id AND p.process_type = 'enhancement'
+    WHERE m.created_at >= cutoff
+       OR m.media_id IN (SELECT r.media_id FROM ready r)
+    ORDER BY m.created_at DESC;
+$$;
+
+-- Approved & completed images with no enhancement pipeline record at all,
+-- newest first (anti-join used by diagnose_pending.py's "truly pending" check)
+CREATE OR REPLACE FUNCTION public.pending_enhancements(p_limit integer DEFAULT 50)
+RETURNS TABLE (
+    media_id uuid,
+    file_path text,
+    status text,
+    approval_status text,
+    created_at timestamp with time zone
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT m.media_id, m.file_path, m.status, m.approval_status, m.created_at
+    FROM public.media_files m
+    WHERE m.approval_status = 'approved'
+      AND m.status = 'completed'
+      AND NOT EXISTS (
+          SELECT 1
+          FROM public.media_processing_pipeline p
+          WHERE p.source_media_id = m.media_id AND p.process_type = 'enhancement'
+      )
+    ORDER BY m.created_at DESC
+    LIMIT p_limit;
+$$;
+
+-- Publish media_files and media_processing_pipeline changes over Supabase
+-- Realtime so the service is woken as soon as an image is approved, finishes
+-- uploading or has its enhancement reset to pending (polling remains the
+-- fallback when this is not enabled)
+DO $$
+DECLARE
+    published_table text;
+BEGIN
+    FOREACH published_table IN ARRAY ARRAY['media_files', 'media_processing_pipeline'] LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_publication_tables
+            WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = published_table
+        ) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', published_table);
+        END IF;
+    END LOOP;
+END;
+$$;
@@ -1,10 +1,15 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 from datetime import datetime
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import cv2
+import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -17,10 +22,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shared pool for CPU-bound image work, so it never blocks the event loop
+image_executor: Optional[ThreadPoolExecutor] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the image worker pool on startup and shut it down on exit."""
+    global image_executor
+    
+    # The pool already runs one image per core; OpenCV's own threads on top of
+    # that would oversubscribe the CPU (the setting is process-wide)
+    cv2.setNumThreads(1)
+    image_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="image")
+    
+    yield
+    
+    image_executor.shutdown(wait=False, cancel_futures=True)
+
+
 app = FastAPI(
     title="OnShelf Image Processor",
     description="Microservice for processing product images with AI-powered enhancements",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -36,6 +61,26 @@ app.add_middleware(
 async def root():
     return {"status": "healthy", "service": "OnShelf Image Processor"}
 
+def process_image_sync(data: bytes) -> Dict[str, Any]:
+    """
+    Decode and process an uploaded image; runs on image_executor.
+    
+    Args:
+        data: Encoded image bytes
+        
+    Returns:
+        Details of the processed image
+    """
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+    
+    # TODO: Implement image processing logic
+    
+    height, width = image.shape[:2]
+    return {"width": width, "height": height}
+
+
 @app.post("/process")
 async def process_image(
     file: UploadFile = File(...),
@@ -46,14 +91,20 @@ async def process_image(
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Process the image based on requested operations
-        # TODO: Implement image processing logic
+        # Decode and process the image based on requested operations off the
+        # event loop; OpenCV releases the GIL, so the pool threads run in parallel
+        data = await file.read()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(image_executor, process_image_sync, data)
         
         return {
             "status": "success",
             "message": "Image processed successfully",
+            "image": result,
             "timestamp": datetime.utcnow().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
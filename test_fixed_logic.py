@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 """Test the fixed service logic to ensure it handles pending pipeline records correctly."""
 
-from database.supabase_client import SupabaseClient
+from database.supabase_client import (
+    MEDIA_FILES_TABLE,
+    PIPELINE_TABLE,
+    PROCESS_TYPE_ENHANCEMENT,
+    STATUS_COMPLETED,
+    STATUS_PENDING,
+    get_client,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,7 +19,7 @@ def test_fixed_polling_logic():
     print("=" * 50)
     
     try:
-        db_client = SupabaseClient()
+        db_client = get_client()
         
         print("\n📋 TESTING get_pending_images() with fixed logic...")
         
@@ -21,18 +28,26 @@ def test_fixed_polling_logic():
         
         print(f"✅ Found {len(pending_images)} images to process")
         
+        # Fetch the pipeline status of every pending image in one query
+        pipeline_records = {}
+        if pending_images:
+            pipeline_check = db_client.client.table(PIPELINE_TABLE).select(
+                "source_media_id", "process_status", "created_at"
+            ).in_("source_media_id", [image["media_id"] for image in pending_images]).eq(
+                "process_type", PROCESS_TYPE_ENHANCEMENT
+            ).execute()
+            pipeline_records = {record["source_media_id"]: record for record in pipeline_check.data}
+        
         for image in pending_images:
             media_id = image["media_id"]
             print(f"  🔄 {media_id[:8]}... | {image['storage_path']}")
             
             # Check what the pipeline status is for this image
-            pipeline_check = db_client.client.table("media_processing_pipeline").select(
-                "process_status", "created_at"
-            ).eq("source_media_id", media_id).eq("process_type", "enhancement").execute()
+            record = pipeline_records.get(media_id)
             
-            if pipeline_check.data:
-                status = pipeline_check.data[0]["process_status"]
-                created = pipeline_check.data[0]["created_at"][:19]
+            if record:
+                status = record["process_status"]
+                created = record["created_at"][:19]
                 print(f"     📊 Pipeline Status: {status} (created: {created})")
             else:
                 print(f"     🆕 New image - no pipeline record")
@@ -59,10 +74,10 @@ def create_test_pending_record():
     print(f"\n🔧 CREATING TEST PENDING RECORD...")
     
     try:
-        db_client = SupabaseClient()
+        db_client = get_client()
         
         # Get a completed image to use for testing
-        completed_images = db_client.client.table("media_files").select(
+        completed_images = db_client.client.table(MEDIA_FILES_TABLE).select(
             "media_id"
         ).eq("approval_status", "approved").eq("status", "completed").limit(1).execute()
         
@@ -73,19 +88,21 @@ def create_test_pending_record():
         test_media_id = completed_images.data[0]["media_id"]
         print(f"   Using test image: {test_media_id[:8]}...")
         
-        # Check if it already has a pipeline record
-        existing = db_client.client.table("media_processing_pipeline").select(
-            "pipeline_id", "process_status"
-        ).eq("source_media_id", test_media_id).eq("process_type", "enhancement").execute()
+        # Reset its pipeline record to pending for testing, if it has a
+        # completed one; the update returns the rows it changed, so no
+        # separate lookup is needed
+        reset = db_client.client.table(PIPELINE_TABLE).update({
+            "process_status": STATUS_PENDING
+        }).eq("source_media_id", test_media_id).eq("process_type", PROCESS_TYPE_ENHANCEMENT).eq(
+            "process_status", STATUS_COMPLETED
+        ).execute()
         
-        if existing.data and existing.data[0]["process_status"] == "completed":
-            # Reset it to pending for testing
-            db_client.client.table("media_processing_pipeline").update({
-                "process_status": "pending"
-            }).eq("source_media_id", test_media_id).eq("process_type", "enhancement").execute()
-            
+        if reset.data:
             print(f"   ✅ Reset existing record to 'pending' status")
             
+            # The reset bypassed the client, so drop its cached pending list
+            db_client.invalidate_pending_images()
+            
             # Now test if our logic picks it up
             pending_images = db_client.get_pending_images(limit=1)
             
@@ -93,9 +110,9 @@ def create_test_pending_record():
                 print(f"   🎉 SUCCESS! Fixed logic correctly found the pending image")
                 
                 # Reset it back to completed
-                db_client.client.table("media_processing_pipeline").update({
-                    "process_status": "completed"
-                }).eq("source_media_id", test_media_id).eq("process_type", "enhancement").execute()
+                db_client.client.table(PIPELINE_TABLE).update({
+                    "process_status": STATUS_COMPLETED
+                }).eq("source_media_id", test_media_id).eq("process_type", PROCESS_TYPE_ENHANCEMENT).execute()
                 
                 return True
             else:
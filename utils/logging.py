@@ -1,59 +1,106 @@
 """Structured logging configuration for the image processing service."""
 
+import atexit
+import logging
+import logging.handlers
+import queue
 import structlog
 import sys
 import os
 from typing import Any, Dict
 
+try:
+    import orjson
+except ImportError:  # optional, falls back to the json module
+    orjson = None
+
+_configured = False
+
+
+def _orjson_dumps(event_dict: Dict[str, Any], default=None, **kwargs) -> str:
+    """Serialize a log event with orjson, for JSONRenderer(serializer=...)."""
+    # Non-str keys are stringified, as the json module does
+    return orjson.dumps(
+        event_dict, default=default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    ).decode()
+
 
 def setup_logging(log_level: str = "INFO") -> structlog.BoundLogger:
     """
     Configure structured logging for the application.
     
+    Only the first call configures structlog and stdlib logging; later calls
+    return a logger from the existing configuration.
+    
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
         
     Returns:
         Configured logger instance
     """
+    global _configured
+    if _configured:
+        return structlog.get_logger()
+    
+    processors = [
+        # Drop events below the stdlib level before any processor or the
+        # renderer runs
+        structlog.stdlib.filter_by_level,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+    ]
+    
+    # Call sites are looked up from the stack on every line; events are
+    # unique enough to grep for, so only pay for it when debugging
+    if log_level.upper() == "DEBUG":
+        processors.append(structlog.processors.CallsiteParameterAdder(
+            parameters=[
+                structlog.processors.CallsiteParameter.FILENAME,
+                structlog.processors.CallsiteParameter.LINENO,
+            ]
+        ))
+    
+    if orjson is not None:
+        processors.append(structlog.processors.JSONRenderer(serializer=_orjson_dumps))
+    else:
+        processors.append(structlog.processors.JSONRenderer())
+    
     structlog.configure(
-        processors=[
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.add_logger_name,
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.CallsiteParameterAdder(
-                parameters=[
-                    structlog.processors.CallsiteParameter.FILENAME,
-                    structlog.processors.CallsiteParameter.LINENO,
-                ]
-            ),
-            structlog.processors.JSONRenderer()
-        ],
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
     
-    # Set the log level
-    import logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, log_level.upper(), logging.INFO)
-    )
+    # Set the log level, unless the host process (uvicorn, gunicorn) already
+    # installed root handlers - adding ours would duplicate every line
+    if not logging.getLogger().handlers:
+        # Lines are written to stdout by a listener thread, so a burst of
+        # events does not block the worker on the stream; the queue is
+        # drained at exit
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        
+        root_logger = logging.getLogger()
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        root_logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
     
+    _configured = True
     return structlog.get_logger()
 
 
-def log_processing_start(logger: structlog.BoundLogger, media_id: str, storage_path: str) -> None:
-    """Log the start of image processing."""
+def log_processing_start(logger: structlog.BoundLogger, storage_path: str) -> None:
+    """Log the start of image processing (logger is bound to the media_id)."""
     logger.info(
         "image_processing_started",
-        media_id=media_id,
         storage_path=storage_path,
         event_type="processing_start"
     )
@@ -61,14 +108,12 @@ def log_processing_start(logger: structlog.BoundLogger, media_id: str, storage_p
 
 def log_processing_complete(
     logger: structlog.BoundLogger, 
-    media_id: str, 
     duration_seconds: float,
     metadata: Dict[str, Any]
 ) -> None:
-    """Log successful completion of image processing."""
+    """Log successful completion of image processing (logger is bound to the media_id)."""
     logger.info(
         "image_processing_completed",
-        media_id=media_id,
         duration_seconds=duration_seconds,
         metadata=metadata,
         event_type="processing_complete"
@@ -77,14 +122,12 @@ def log_processing_complete(
 
 def log_processing_failed(
     logger: structlog.BoundLogger,
-    media_id: str,
     error: Exception,
     stage: str
 ) -> None:
-    """Log processing failure with error details."""
+    """Log processing failure with error details (logger is bound to the media_id)."""
     logger.error(
         "image_processing_failed",
-        media_id=media_id,
         error_type=type(error).__name__,
         error_message=str(error),
         stage=stage,